@@ -3,7 +3,18 @@
 import logging
 import re
 from .session import Session
+from .transport import (  # pylint: disable=unused-import
+    HTTPXTransport, RecordingTransport, ReplayTransport
+)
 from .api_wrappers import API_WRAPPER_CLASSES
+from .api_wrappers.app_password import TokenStore  # pylint: disable=unused-import
+from .api_wrappers.capabilities import CapabilitiesCache
+from .common.cache import FileIdCache, MetadataCache, ContentCache  # pylint: disable=unused-import
+from .common.parallel import Submitter, RequestLimiter, AdaptiveLimiter  # pylint: disable=unused-import
+from .common.retry import RetryPolicy  # pylint: disable=unused-import
+from .common.state import (  # pylint: disable=unused-import
+    StateStore, MemoryStateStore, FileStateStore, DbmStateStore
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,13 +45,122 @@ class NextCloud(object):
       >>> with Nextcloud('https://nextcloud.mysite.com',
       ...                user='admin', password='admin') as nxc:
       ...     # some actions #
+
+    Capabilities are cached (see `get_cached_capabilities`), the cache can be configured::
+
+      >>> from nextcloud import CapabilitiesCache
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               capabilities_cache=CapabilitiesCache(ttl=600, path='~/.cache/nextcloud'))
+
+    File ids of the listed paths are cached for a minute (see `FileIdCache`,
+    paths changed by other clients meanwhile resolve to stale ids), to disable it::
+
+      >>> from nextcloud import FileIdCache
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               file_id_cache=FileIdCache(max_entries=0))
+
+    WebDAV listings can be cached (see `MetadataCache`)::
+
+      >>> from nextcloud import MetadataCache
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               metadata_cache=MetadataCache(ttl=30))
+      >>> s.get_file('foo.txt')  # PROPFIND
+      >>> s.get_file('foo.txt')  # no request
+      >>> s.metadata_cache.stats
+      {'hits': 1, 'misses': 1, 'revalidations': 0, 'evictions': 0, 'entries': 1, 'bytes': 483}
+
+    Downloaded contents can be saved on disk, to be transferred again only if they changed
+    (see `ContentCache`)::
+
+      >>> from nextcloud import ContentCache
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               content_cache=ContentCache('~/.cache/nextcloud/files'))
+
+    Failed requests (connection errors, 429, 502, 503, 504) are retried with an
+    exponential backoff (see `RetryPolicy`), the policy can be configured::
+
+      >>> from nextcloud import RetryPolicy
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               session_kwargs={'retry_policy': RetryPolicy(total=5)})
+
+    Requests can be limited (rate and concurrency) by type of API, the concurrency
+    being adapted to the server load (see `RequestLimiter`, `AdaptiveLimiter`)::
+
+      >>> from nextcloud import RequestLimiter, AdaptiveLimiter
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               session_kwargs={'limits': {
+      ...                   'WebDAVApiWrapper': RequestLimiter(concurrency=AdaptiveLimiter()),
+      ...                   'default': RequestLimiter(rate=20, concurrency=4)}})
+
+    The account password can be exchanged for an app password, saved to be reused
+    by the next clients (see `login_with_app_password`, `TokenStore`)::
+
+      >>> from nextcloud import TokenStore
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               token_store=TokenStore('~/.config/nextcloud/tokens.json'))
+      >>> s.login_with_app_password()
+      >>> # some actions #
+      >>> s.logout(revoke_app_password=True)
+
+    Or granted by the user in a browser (see `login_with_login_flow`)::
+
+      >>> import webbrowser
+      >>> s = Nextcloud('https://nextcloud.mysite.com')
+      >>> s.login_with_login_flow(open_url=webbrowser.open)
+
+    The state of the client (cookies of the persistent session, capabilities,
+    app passwords) can be saved, so that other processes start without
+    login checks (see `FileStateStore`, `DbmStateStore`)::
+
+      >>> from nextcloud import FileStateStore
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               state_store=FileStateStore('~/.cache/nextcloud/state.json'),
+      ...               session_kwargs={'on_session_login': 'get_user'})
+      >>> s.login()  # restores the cookies saved by a previous client (if not too old)
+      >>> # some actions #
+      >>> s.logout()  # saves the cookies
+
+    Requests can be sent with HTTP/2, multiplexed on one connection
+    (see `HTTPXTransport`)::
+
+      >>> from nextcloud import HTTPXTransport
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               session_kwargs={'transport': HTTPXTransport()})
+
+    Requests and responses can be recorded in a cassette, to be replayed
+    without network (see `RecordingTransport`, `ReplayTransport`)::
+
+      >>> from nextcloud import RecordingTransport, ReplayTransport
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               session_kwargs={'transport': RecordingTransport('cassette.json')})
+      >>> s.login()
+      >>> # some actions #
+      >>> s.logout()  # saves the cassette
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               session_kwargs={'transport': ReplayTransport('cassette.json')})
+
+    Every method can be called asynchronously through `submit`, getting a
+    concurrent.futures.Future (see `Submitter`)::
+
+      >>> futures = [s.submit.set_quota_of_group_folder(fid, quota)
+      ...            for fid, quota in quotas.items()]
+      >>> [future.result().is_ok for future in futures]
+
+    The calls are run by a pool of 8 threads, another executor can be given
+    (and shared by several clients)::
+
+      >>> from concurrent.futures import ThreadPoolExecutor
+      >>> s = Nextcloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...               executor=ThreadPoolExecutor(max_workers=4))
     """
 
     # pylint: disable=too-many-arguments
     def __init__(self, endpoint=None,
                  user=None, password=None, auth=None,
                  session_kwargs=None,
-                 session=None, **kwargs):
+                 session=None, capabilities_cache=None, file_id_cache=None,
+                 metadata_cache=None, content_cache=None, executor=None,
+                 token_store=None, state_store=None, **kwargs):
         if 'json_output' in kwargs:
             _LOGGER.warning(
                 "'json_output' argument is deprecated :"
@@ -52,6 +172,15 @@ class NextCloud(object):
             url=endpoint, user=user, password=password, auth=auth,
             session_kwargs=session_kwargs
         )
+        if state_store is not None:
+            self.session.state_store = state_store
+        self.capabilities_cache = capabilities_cache or CapabilitiesCache(store=state_store)
+        self.file_id_cache = FileIdCache() if file_id_cache is None else file_id_cache
+        self.metadata_cache = metadata_cache
+        self.content_cache = content_cache
+        self.submit = Submitter(self, executor=executor)
+        self.token_store = token_store or (
+            TokenStore(store=state_store) if state_store is not None else None)
         #FIXME see base & requester
         # @FIX_API_URL fix api url for case nextcloud is not on server root {{
         url_parts = re.match(r"^((https?://)?[^/]*)(/.*)?", self.session.url)
@@ -98,9 +227,20 @@ class NextCloud(object):
         return self.session.login(user=user, password=password, auth=auth,
                                   client=self)
 
-    def logout(self):
-        " Session logout() "
-        self.session.logout()
+    def logout(self, revoke_app_password=False):
+        """
+        Session logout()
+
+        :param revoke_app_password: revoke the app password used by the session
+                                    (see login_with_app_password)
+        """
+        if revoke_app_password and self.session.app_password:
+            self.delete_app_password()
+            self.session.use_app_password(None)
+            self.session.clear_state()
+            self.session.logout(save_state=False)
+        else:
+            self.session.logout()
 
     def _with_auth(self, auth=None, **kwargs):
         #pylint: disable=protected-access
@@ -165,13 +165,16 @@ class Item(six.with_metaclass(MetaModel)):
         return vals
 
     @classmethod
-    def build_xml_propfind(cls, instr=None, filter_rules=None, use_default=False, fields=None):
+    def build_xml_propfind(cls, instr=None, filter_rules=None, use_default=False, fields=None,
+                           limit=None, offset=None):
         """see build_xml.build_propfind_datas
 
         :param instr(str): you can use 'oc:filter-files' or 'd:propfind' (default)
         :param filter_rules : a dict { namespace: {key : value } }
         :param fields: a dict { namespace: [key…] } or a list of attr name
         :param use_default:   True to use all values specified in Model
+        :param limit(int):    max number of results (REPORT pagination)
+        :param offset(int):   index of the first result (REPORT pagination)
         """
         def _build_fields_dict(only_required=False, attr_name_list=None):
             _fields = {k: [] for k in NAMESPACES_MAP}
@@ -195,13 +198,18 @@ class Item(six.with_metaclass(MetaModel)):
         if not (fields or filter_rules):
             return None
         return BuildXML.build_propfind_datas(instr=instr, filter_rules=filter_rules,
-                                              fields=(fields or {}))
+                                              fields=(fields or {}),
+                                              limit=limit, offset=offset)
 
     @classmethod
     def build_xml_propupdate(cls, values):
         """ see build_xml.build_propupdate_datas """
         return BuildXML.build_propupdate_datas(values)
 
+    @classmethod
+    def _on_parsed(cls, items, wrapper):
+        """ Hook called with the instances built from a response (e.g. to cache them) """
+
     @classmethod
     def from_response(cls, resp, filtered=None, wrapper=None, multi=None):
         """ Build set of Model instance from a NextcloudResponse """
@@ -225,6 +233,7 @@ class Item(six.with_metaclass(MetaModel)):
 
             attr_datas = [cls(xml_data=xml_data, wrapper=wrapper)
                           for xml_data in response_xml_data]
+        cls._on_parsed(attr_datas, wrapper)
         if not multi:
             resp.data = attr_datas[0] if attr_datas else None
             return resp
@@ -239,6 +248,19 @@ class Item(six.with_metaclass(MetaModel)):
         resp.data = ItemSet(cls, attr_datas)
         return resp
 
+    @classmethod
+    def iter_from_xml(cls, data, wrapper=None):
+        """
+        Build Model instances one by one from a multistatus xml
+        (see parse_xml.iter_responses)
+
+        :param data: raw xml data (bytes) or file-like object
+        """
+        for xml_data in ParseXML.iter_responses(data):
+            item = cls(xml_data=xml_data, wrapper=wrapper)
+            cls._on_parsed([item], wrapper)
+            yield item
+
     def as_dict(self):
         """ Return current instance as a {k: val} dict """
         attrs = [v.attr_name for v in self._attrs]
@@ -1,6 +1,7 @@
 from nextcloud.base import API_WRAPPER_CLASSES
 
 from .activity import Activity
+from .app_password import AppPassword, LoginFlow
 from .apps import Apps
 from .capabilities import Capabilities
 from .federated_cloudshares import FederatedCloudShare
@@ -5,7 +5,14 @@ See https://github.com/nextcloud/activity
     https://doc.owncloud.com/server/user_manual/apps/activity.html
     https://doc.owncloud.com/server/developer_manual/core/apis/
 """
+import time
+
+import six
+
 from nextcloud import base
+from ..codes import OCSCode
+from ..common.state import StateStore, FileStateStore
+from ..exceptions import NextCloudError
 
 
 class Activity(base.OCSv2ApiWrapper):
@@ -55,3 +62,79 @@ class Activity(base.OCSv2ApiWrapper):
                 return self.requester.get(url='filter', params=params)
             return self.requester.get(params=params)
         return self.requester.get(url=filter_name, params=params)
+
+    def _get_cursor_key(self, filter_name, object_type, object_id):
+        return 'activity_cursor:%s@%s:%s' % (
+            self.client.user, self.client.url,
+            ':'.join(str(part) for part in (filter_name, object_type, object_id) if part)
+            or 'all')
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    def iter_activities(self, filter_name=None, start_since=None, page_size=100,
+                        checkpoint=None, follow=False, min_interval=5, max_interval=300,
+                        object_type=None, object_id=None):
+        """
+        Iterate over the activities, oldest first, page by page : a page is
+        requested only when the activities of the previous one are consumed.
+
+        The id of the last given activity can be saved in a checkpoint,
+        to continue where the previous iteration stopped (even in another process).
+
+        Args:
+            filter_name (string): Name (id) of the filter (see get_activities)
+            start_since (int): ID of the last activity already seen
+                (default: the one of the checkpoint, or 0 for all activities)
+            page_size (int): How many activities are requested at once
+            checkpoint (string or StateStore): file (or store) where the id
+                of the last given activity is saved
+            follow (bool): Wait for new activities instead of stopping
+                when all activities were consumed
+            min_interval (float): min seconds between polls (if follow)
+            max_interval (float): max seconds between polls (if follow), the
+                interval being doubled each time there is no new activity
+            object_type (string): Filter the activities to a given object (see get_activities)
+            object_id (string): Filter the activities to a given object (see get_activities)
+
+        Returns:
+            iterator of activities (dict)
+
+        Raises:
+            NextCloudError if activities can't be fetched
+        """
+        if isinstance(checkpoint, six.string_types):
+            checkpoint = FileStateStore(checkpoint)
+        store = checkpoint if isinstance(checkpoint, StateStore) else None
+        key = self._get_cursor_key(filter_name, object_type, object_id)
+        cursor = start_since
+        if cursor is None:
+            cursor = (store.get(key) if store else None) or 0
+        saved_cursor = cursor
+        interval = min_interval
+        try:
+            while True:
+                resp = self.get_activities(
+                    filter_name=filter_name, since=cursor, limit=page_size,
+                    object_type=object_type, object_id=object_id, sort='asc')
+                if resp.raw.status_code == OCSCode.NOT_MODIFIED:
+                    # no new activity
+                    activities = []
+                elif resp.is_ok:
+                    activities = resp.data or []
+                else:
+                    raise NextCloudError('Failed to get activities', resp.raw.url, resp)
+                for activity in activities:
+                    # a given activity is never given again
+                    cursor = activity['activity_id']
+                    yield activity
+                if store and cursor != saved_cursor:
+                    store.set(key, cursor)
+                    saved_cursor = cursor
+                if len(activities) >= page_size:
+                    continue
+                if not follow:
+                    return
+                interval = min_interval if activities else min(max_interval, interval * 2)
+                time.sleep(interval)
+        finally:
+            if store and cursor != saved_cursor:
+                store.set(key, cursor)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+App password API wrappers (app password exchange, login flow v2)
+See https://docs.nextcloud.com/server/latest/developer_manual/client_apis/LoginFlow/index.html
+"""
+import logging
+import time
+from .. import base
+from ..codes import ExternalApiCodes
+from ..common.state import FileStateStore
+from ..exceptions import NextCloudLoginError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# pylint: disable=useless-object-inheritance
+class TokenStore(object):
+    """
+    Store of app passwords, keyed by server url and user,
+    saved in a file only readable by its owner (or in a StateStore).
+
+    :param path:  file where the app passwords are saved
+    :param store: StateStore where the app passwords are saved (instead of path)
+    """
+
+    def __init__(self, path='~/.config/nextcloud/tokens.json', store=None):
+        self.store = store or FileStateStore(path)
+
+    @staticmethod
+    def _get_key(url, user):
+        return 'app_password:%s@%s' % (user, url.rstrip('/'))
+
+    def get(self, url, user):
+        """ Get the app password of user on server url (None if unknown) """
+        return self.store.get(self._get_key(url, user))
+
+    def set(self, url, user, app_password):
+        """ Save the app password of user on server url """
+        self.store.set(self._get_key(url, user), app_password)
+
+    def delete(self, url, user):
+        """ Forget the app password of user on server url """
+        self.store.delete(self._get_key(url, user))
+
+
+def _use_app_password(client, app_password, user=None):
+    session = client.session
+    session.use_app_password(app_password, user=user)
+    if client.token_store:
+        client.token_store.set(session.url, session.user, app_password)
+
+
+class AppPassword(base.OCSv2ApiWrapper):
+    """ App password API wrapper """
+    API_URL = '/ocs/v2.php/core'
+
+    def get_app_password(self):
+        """
+        Exchange the account password for an app password
+
+        :returns: requester response, with data {'apppassword': <app password>}
+        """
+        return self.requester.get('getapppassword')
+
+    def rotate_app_password(self):
+        """
+        Replace the app password used by the session with a new one
+        (the token store of the client is updated)
+
+        :returns: requester response, with data {'apppassword': <app password>}
+        """
+        resp = self.requester.post('apppassword/rotate')
+        if resp.is_ok:
+            _use_app_password(self.client, resp.data['apppassword'])
+        return resp
+
+    def delete_app_password(self):
+        """
+        Revoke the app password used by the session
+        (and forget it in the token store of the client)
+
+        :returns: requester response
+        """
+        resp = self.requester.delete('apppassword')
+        if resp.is_ok and self.client.token_store:
+            self.client.token_store.delete(self.client.url, self.client.user)
+        return resp
+
+    def login_with_app_password(self):
+        """
+        Create a persistent session (see NextCloud.login) authenticated with an
+        app password instead of the account password, so that the server doesn't
+        check the password (slow hash, brute force protection) at each request.
+
+        The app password is read from the token store of the client, or
+        obtained with the account password (and saved in the token store).
+
+        :returns: the app password
+        :raises: NextCloudLoginError if no app password could be obtained
+        """
+        session = self.client.session
+        store = self.client.token_store
+        app_password = store.get(session.url, session.user) if store else None
+        if app_password is not None:
+            session.use_app_password(app_password)
+            # checked before login : the login check (on_session_login)
+            # would fail with a revoked app password
+            if self.client.get_user().raw.status_code != ExternalApiCodes.UNAUTHORIZED:
+                self.client.login()
+                return app_password
+            # the app password was revoked (and the sessions using it)
+            store.delete(session.url, session.user)
+            session.clear_state()
+            session.use_app_password(None)
+        resp = self.get_app_password()
+        if not resp.is_ok:
+            raise NextCloudLoginError(
+                'Failed to get an app password', session.url, resp)
+        app_password = resp.data['apppassword']
+        _use_app_password(self.client, app_password)
+        self.client.login()
+        return app_password
+
+
+class LoginFlow(base.BaseApiWrapper):
+    """ Login flow v2 API wrapper """
+    API_URL = '/index.php/login/v2'
+    JSON_ABLE = False
+    SUCCESS_CODE = 200
+
+    def start_login_flow(self):
+        """
+        Start a login flow : the user shall open the login url in a browser
+
+        :returns: requester response, with json_data
+                  {'poll': {'token': <token>, 'endpoint': <url>}, 'login': <url>}
+        """
+        return self.requester.post()
+
+    def poll_login_flow(self, token):
+        """
+        Get the credentials granted by the user in a login flow
+
+        :param token: poll token (see start_login_flow)
+        :returns: requester response, with json_data
+                  {'server': <url>, 'loginName': <user>, 'appPassword': <app password>}
+                  (404 while the login is not granted)
+        """
+        return self.requester.post('poll', data={'token': token})
+
+    def login_with_login_flow(self, open_url=None, timeout=300, interval=2):
+        """
+        Get an app password granted by the user in a browser (login flow v2),
+        and create a persistent session using it (see login_with_app_password)
+
+        :param open_url: function called with the login url (e.g. webbrowser.open),
+                         default: log the url
+        :param timeout:  seconds to wait for the user
+        :param interval: seconds between the polls
+        :returns: the app password
+        :raises: NextCloudLoginError if the login was not granted in time
+        """
+        resp = self.start_login_flow()
+        if not resp.is_ok:
+            raise NextCloudLoginError(
+                'Failed to start login flow', self.client.url, resp)
+        flow = resp.json_data
+        if open_url:
+            open_url(flow['login'])
+        else:
+            _LOGGER.warning('Open %s to grant access', flow['login'])
+        end_time = time.time() + timeout
+        while True:
+            resp = self.poll_login_flow(flow['poll']['token'])
+            if resp.is_ok:
+                break
+            if time.time() + interval > end_time:
+                raise NextCloudLoginError(
+                    'Login flow not granted', self.client.url, resp)
+            time.sleep(interval)
+        credentials = resp.json_data
+        _use_app_password(self.client, credentials['appPassword'], user=credentials['loginName'])
+        self.client.login()
+        return credentials['appPassword']
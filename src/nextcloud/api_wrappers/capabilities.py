@@ -4,29 +4,180 @@ Capabilities API wrapper
 See https://docs.nextcloud.com/server/14/developer_manual/client_apis/OCS/index.html#capabilities-api
     https://doc.owncloud.com/server/developer_manual/core/apis/ocs-capabilities.html
 """
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
 from .. import base
+from ..api.model import Item
+from ..api.properties import Property
+from ..exceptions import NextCloudError
 
-# # 2021/05/24 luffah: here the way to make an object version of the result
-#
-# from ..api.model import Item
-# from ..api.properties import Property
-#
-# def _extract_major_version(vals):
-#     return int(vals.get('major', 0))
-#
-# class CapabilitiesItem(Item):
-#
-#     version = Property()
-#     capabilities = Property()
-#
-#     major_version = Property(json='version',
-#                              parse_json_value=_extract_major_version)
-#
-#     def __get_repr_info__(self):
-#         return "{'version': '%s', 'capabilities': %s}" % (
-#             self.version['string'],
-#             repr([k for k in self.capabilities])
-#         )
+_LOGGER = logging.getLogger(__name__)
+
+
+def _extract_major_version(vals):
+    return int(vals.get('major', 0))
+
+
+class CapabilitiesItem(Item):
+    """
+    Capabilities of the server
+
+    Example :
+    >>> caps = nxc.get_cached_capabilities()
+    >>> caps.major_version
+    21
+    >>> caps.has_capability('files', 'bigfilechunking')
+    True
+    """
+
+    version = Property()
+    capabilities = Property()
+
+    major_version = Property(json='version',
+                             parse_json_value=_extract_major_version)
+
+    def get_capability(self, *keys):
+        """
+        Get a capability value
+
+        :param keys: path in capabilities, e.g. 'files', 'bigfilechunking'
+        :returns: the value or None if not defined
+        """
+        value = self.capabilities
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    def has_capability(self, *keys):
+        """
+        Say if a capability is defined and enabled
+
+        :param keys: path in capabilities, e.g. 'files', 'bigfilechunking'
+        :returns: bool
+        """
+        return bool(self.get_capability(*keys))
+
+    def __get_repr_info__(self):
+        return "{'version': '%s', 'capabilities': %s}" % (
+            self.version['string'],
+            repr([k for k in self.capabilities])
+        )
+
+
+# pylint: disable=useless-object-inheritance
+class CapabilitiesCache(object):
+    """
+    Cache of capabilities, keyed by server url.
+
+    :param ttl:       seconds during which cached capabilities are used (default 1 hour)
+    :param stale_ttl: seconds (after ttl) during which outdated capabilities are used
+                      while being refreshed in background (default 1 day)
+    :param path:      directory where capabilities are saved, to be shared
+                      between processes (default None: memory only)
+    :param store:     StateStore where capabilities are saved (instead of path)
+    """
+
+    def __init__(self, ttl=3600, stale_ttl=86400, path=None, store=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.path = os.path.expanduser(path) if path else None
+        self.store = store
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _get_file_path(self, key):
+        return os.path.join(
+            self.path, 'capabilities-%s.json' % hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is None and (self.path or self.store):
+            try:
+                if self.store:
+                    saved = self.store.get('capabilities:' + key) or {}
+                else:
+                    with open(self._get_file_path(key)) as cache_file:
+                        saved = json.load(cache_file)
+                entry = (saved['timestamp'], saved['data'])
+                self._entries[key] = entry
+            except (IOError, OSError, ValueError, KeyError):
+                pass
+        return entry
+
+    def set(self, key, data):
+        """ Store capabilities data for key (server url) """
+        entry = (time.time(), data)
+        with self._lock:
+            self._entries[key] = entry
+        if self.store:
+            self.store.set('capabilities:' + key, {'timestamp': entry[0], 'data': data})
+        elif self.path:
+            try:
+                if not os.path.isdir(self.path):
+                    os.makedirs(self.path)
+                file_path = self._get_file_path(key)
+                with open(file_path + '.tmp', 'w') as cache_file:
+                    json.dump({'url': key, 'timestamp': entry[0], 'data': data}, cache_file)
+                os.rename(file_path + '.tmp', file_path)
+            except (IOError, OSError) as error:
+                _LOGGER.warning('Failed to save capabilities in %s: %s', self.path, error)
+
+    def invalidate(self, key):
+        """ Forget capabilities of key (server url) """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.store:
+            self.store.delete('capabilities:' + key)
+        elif self.path:
+            try:
+                os.remove(self._get_file_path(key))
+            except OSError:
+                pass
+
+    def _refresh(self, key, fetch_func):
+        try:
+            self.set(key, fetch_func())
+        except Exception as error:  # pylint: disable=broad-except
+            _LOGGER.warning('Failed to refresh capabilities of %s: %s', key, error)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, fetch_func, max_age=None):
+        """
+        Get capabilities data of key (server url)
+
+        :param key:       server url
+        :param fetch_func: function returning fresh capabilities data
+        :param max_age:   max age of the data in seconds (default: ttl)
+        :returns: capabilities data
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age <= max_age:
+                return entry[1]
+            if age <= max_age + self.stale_ttl:
+                with self._lock:
+                    start_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                if start_refresh:
+                    thread = threading.Thread(target=self._refresh, args=(key, fetch_func))
+                    thread.daemon = True
+                    thread.start()
+                return entry[1]
+        data = fetch_func()
+        self.set(key, data)
+        return data
 
 
 class Capabilities(base.OCSv1ApiWrapper):
@@ -35,5 +186,48 @@ class Capabilities(base.OCSv1ApiWrapper):
 
     def get_capabilities(self):
         """ Obtain capabilities provided by the Nextcloud server and its apps """
-        # return CapabilitiesItem.from_response(self.requester.get())
         return self.requester.get()
+
+    def _fetch_capabilities_data(self):
+        resp = self.get_capabilities()
+        if not resp.is_ok:
+            raise NextCloudError(resp.get_error_message(), self.API_URL, resp)
+        return resp.data
+
+    @property
+    def _capabilities_cache(self):
+        return self.client.capabilities_cache
+
+    def get_cached_capabilities(self, max_age=None):
+        """
+        Obtain capabilities, using the client capabilities cache
+        (see CapabilitiesCache)
+
+        :param max_age: max age of cached capabilities in seconds (default: cache ttl)
+        :returns: CapabilitiesItem
+        """
+        data = self._capabilities_cache.get(self.client.url,
+                                            self._fetch_capabilities_data,
+                                            max_age=max_age)
+        return CapabilitiesItem(json_data=data, wrapper=self)
+
+    def clear_capabilities_cache(self):
+        """ Forget cached capabilities """
+        self._capabilities_cache.invalidate(self.client.url)
+
+    def get_server_major_version(self):
+        """
+        Get the major version of the server (using cached capabilities)
+
+        :returns: int
+        """
+        return self.get_cached_capabilities().major_version
+
+    def has_capability(self, *keys):
+        """
+        Say if a capability is enabled (using cached capabilities)
+
+        :param keys: path in capabilities, e.g. 'files', 'bigfilechunking'
+        :returns: bool
+        """
+        return self.get_cached_capabilities().has_capability(*keys)
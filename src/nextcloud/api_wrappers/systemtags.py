@@ -4,9 +4,14 @@ SystemTags API wrapper
 See https://doc.owncloud.com/server/developer_manual/webdav_api/tags.html
 """
 import json
+import threading
+import time
+import six
 from ..base import WebDAVApiWrapper
 from ..api import Item
 from ..api.properties import OCProp
+from ..common import parallel
+from ..exceptions import NextCloudError
 from . import webdav
 
 
@@ -32,6 +37,21 @@ class Tag(Item):
         )
         return ret.data or []
 
+    def iter_related_files(self, path='', page_size=500, fields=None):
+        """
+        Iterate over files related to current tag, fetched page by page
+        :param path: (optionnal) a path to search in
+        :param page_size: number of files fetched per request
+        :param fields: (optionnal) file properties to fetch
+        :returns: iterator of File objects
+        """
+        return self._wrapper.client.iter_files_with_filter(
+            path=path,
+            filter_rules={'oc': {'systemtag': self.id}},
+            page_size=page_size,
+            fields=fields
+        )
+
     def delete(self):
         """
         Delete current tag
@@ -47,10 +67,12 @@ class File(webdav.File):
 
     def _get_file_kwargs(self):
         kwargs = {}
-        if not getattr(self, 'file_id', False):
+        file_id = getattr(self, 'file_id', False) or \
+            self._wrapper.client.file_id_cache.get_file_id(self._get_remote_path())
+        if not file_id:
             kwargs['path'] = self._get_remote_path()
         else:
-            kwargs['file_id'] = self.file_id
+            kwargs['file_id'] = file_id
         return kwargs
 
     def get_tags(self):
@@ -87,9 +109,96 @@ class File(webdav.File):
 webdav.File = File
 
 
+# pylint: disable=useless-object-inheritance
+class TagRegistry(object):
+    """
+    Tags indexed by name and by id.
+
+    All tags are fetched at once, then lookups are dictionary hits until
+    the registry expires (ttl in seconds) or is invalidated. A name or id
+    not registered is looked up once more in freshly fetched tags, so that
+    tags created by another client are found.
+
+    :param fetch_func: function returning the list of all tags
+    :param ttl:        seconds during which fetched tags are used
+    """
+
+    def __init__(self, fetch_func, ttl=300):
+        self.fetch_func = fetch_func
+        self.ttl = ttl
+        self._by_name = {}
+        self._by_id = {}
+        self._timestamp = None
+        self._lock = threading.RLock()
+
+    def load(self, tags):
+        """ Replace registered tags """
+        with self._lock:
+            self._by_name = {tag.display_name: tag for tag in tags}
+            self._by_id = {tag.id: tag for tag in tags}
+            self._timestamp = time.time()
+
+    def _ensure_loaded(self):
+        # :returns: True if the tags were fetched
+        with self._lock:
+            if self._timestamp is None or time.time() - self._timestamp > self.ttl:
+                self.load(self.fetch_func())
+                return True
+            return False
+
+    def _get(self, index_name, key):
+        with self._lock:
+            fetched = self._ensure_loaded()
+            tag = getattr(self, index_name).get(key)
+            if tag is None and not fetched:
+                # may have been created by another client
+                self.load(self.fetch_func())
+                tag = getattr(self, index_name).get(key)
+            return tag
+
+    def get_by_name(self, name):
+        """ Get tag from its name (None if not found) """
+        return self._get('_by_name', name)
+
+    def get_by_id(self, tag_id):
+        """ Get tag from its id (None if not found) """
+        return self._get('_by_id', int(tag_id))
+
+    def add(self, tag):
+        """ Register a tag (e.g. after its creation) """
+        with self._lock:
+            if self._timestamp is not None:
+                self._by_name[tag.display_name] = tag
+                self._by_id[tag.id] = tag
+
+    def discard(self, tag_id):
+        """ Unregister a tag (e.g. after its deletion) """
+        with self._lock:
+            tag = self._by_id.pop(int(tag_id), None)
+            if tag is not None:
+                self._by_name.pop(tag.display_name, None)
+
+    def invalidate(self):
+        """ Forget all tags, they will be fetched again at next lookup """
+        with self._lock:
+            self._timestamp = None
+
+
 class SystemTags(WebDAVApiWrapper):
     """ SystemTags API wrapper """
     API_URL = '/remote.php/dav/systemtags'
+    TAGS_CACHE_TTL = 300
+
+    def __init__(self, *args, **kwargs):
+        super(SystemTags, self).__init__(*args, **kwargs)
+        self.tag_registry = TagRegistry(self._fetch_all_systemtags,
+                                        ttl=self.TAGS_CACHE_TTL)
+
+    def _fetch_all_systemtags(self):
+        resp = self.fetch_systemtags()
+        if not resp.is_ok:
+            raise NextCloudError(resp.get_error_message(), self.API_URL, resp)
+        return self.get_objs_from_response(resp)
 
     def get_systemtags(self):
         """
@@ -97,9 +206,80 @@ class SystemTags(WebDAVApiWrapper):
 
         :returns: list<Tag>
         """
-        return self.get_objs_from_response(
+        tags = self.get_objs_from_response(
             self.fetch_systemtags()
         )
+        self.tag_registry.load(tags)
+        return tags
+
+    def get_systemtag_id(self, name):
+        """
+        Get the id of a nammed tag (using cached tags, fetched again
+        if the name is unknown, see TagRegistry)
+
+        :param name(str): tag name
+        :returns: int or None if the tag doesn't exist
+        """
+        tag = self.tag_registry.get_by_name(name)
+        return tag.id if tag else None
+
+    def iter_files_by_tags(self, tags, mode='or', path='', page_size=500, fields=None):
+        """
+        Iterate over files related to several tags, fetched page by page
+
+        With 'and' mode, the file ids related to all tags but the first are
+        kept in memory, then files of the first tag are filtered.
+
+        :param tags (list): tag ids (int) or tag names (str)
+        :param mode (str): 'or' (files having any tag) or 'and' (files having all tags)
+        :param path (str): (optionnal) a path to search in
+        :param page_size (int): number of files fetched per request
+        :param fields (str list): (optionnal) file properties to fetch
+        :returns: iterator of File objects (each file is returned once)
+        """
+        if mode not in ('or', 'and'):
+            raise ValueError("mode shall be 'or' or 'and'")
+        tag_ids = []
+        for tag in tags:
+            if isinstance(tag, six.string_types):
+                tag_id = self.get_systemtag_id(tag)
+                if not tag_id:
+                    raise ValueError('No tag found (%s)' % tag)
+                tag = tag_id
+            tag_ids.append(int(tag))
+        if fields and 'file_id' not in fields:
+            fields = list(fields) + ['file_id']
+
+        def _iter_files(tag_id, _fields=fields):
+            return self.client.iter_files_with_filter(
+                path=path, filter_rules={'oc': {'systemtag': tag_id}},
+                page_size=page_size, fields=_fields)
+
+        if mode == 'or':
+            seen = set()
+            for tag_id in tag_ids:
+                for file_data in _iter_files(tag_id):
+                    if file_data.file_id not in seen:
+                        seen.add(file_data.file_id)
+                        yield file_data
+            return
+
+        if not tag_ids:
+            return
+        wanted = None
+        for tag_id in tag_ids[1:]:
+            file_ids = set(f.file_id for f in _iter_files(tag_id, ['file_id'])
+                           if wanted is None or f.file_id in wanted)
+            wanted = file_ids
+            if not wanted:
+                return
+        for file_data in _iter_files(tag_ids[0]):
+            if wanted is None or file_data.file_id in wanted:
+                yield file_data
+
+    def invalidate_systemtags_cache(self):
+        """ Forget cached tags (e.g. if tags were changed by another client) """
+        self.tag_registry.invalidate()
 
     def get_systemtag(self, name, create=False, **kwargs):
         """
@@ -107,7 +287,7 @@ class SystemTags(WebDAVApiWrapper):
 
         :param name(str): tag name
         :param create(bool): create the tag before getting it (default False)
-        :returns: Tag
+        :returns: Tag (from cached tags if not created, see TagRegistry)
         """
         if create:
             resp = self.create_systemtag(name, **kwargs)
@@ -116,12 +296,9 @@ class SystemTags(WebDAVApiWrapper):
                     'id':resp.data, 'display_name': name
                 }
                 vals.update(kwargs)
-                return Tag(vals)
+                return Tag(vals, wrapper=self)
             return None
-        return self.get_objs_from_response(
-            self.fetch_systemtag(name),
-            one=True
-        )
+        return self.tag_registry.get_by_name(name)
 
     def fetch_systemtag(self, name, fields=None):
         """
@@ -166,6 +343,9 @@ class SystemTags(WebDAVApiWrapper):
         if resp.is_ok:
             resp.data = int(
                 resp.raw.headers['Content-Location'].split('/')[(-1)])
+            vals = {'id': resp.data, 'display_name': name}
+            vals.update(kwargs)
+            self.tag_registry.add(Tag(vals, wrapper=self))
         return resp
 
     def delete_systemtag(self, name=None, tag_id=None):
@@ -178,12 +358,17 @@ class SystemTags(WebDAVApiWrapper):
         :returns: requester response
         """
         if not tag_id:
+            tag_id = self.get_systemtag_id(name)
+        if not tag_id:
+            # not in cached tags, may have been created by another client
             resp = self.fetch_systemtag(name, ['id'])
             if resp.data:
                 tag_id = resp.data[0].id
             if not tag_id:  # lint only
                 return resp
         resp = self.requester.delete(url=(str(tag_id)))
+        if resp.is_ok:
+            self.tag_registry.discard(tag_id)
         return resp
 
 
@@ -193,18 +378,17 @@ class SystemTagsRelation(WebDAVApiWrapper):
 
     def _get_fileid_from_path(self, path):
         """ Tricky function to fetch file """
+        _id = self.client.file_id_cache.get_file_id(path)
+        if _id is not None:
+            return _id
         resp = self.client.get_file_property(path, 'fileid')
-        _id = None
         if resp.data:
             _id = int(resp.data)
+            self.client.file_id_cache.put(path, _id)
         return _id
 
     def _get_systemtag_id_from_name(self, name):
-        resp = self.client.fetch_systemtag(name, ['id'])
-        tag_id = None
-        if resp.data:
-            tag_id = int(resp.data[0].id)
-        return tag_id
+        return self.client.get_systemtag_id(name)
 
     def _default_get_file_id(self, vals):
         path = vals.get('path', None)
@@ -295,3 +479,89 @@ class SystemTagsRelation(WebDAVApiWrapper):
             # tag_id = resp.data
         resp = self.requester.put(url='{}/{}'.format(file_id, tag_id))
         return resp
+
+    def _resolve_file_ids(self, paths, max_workers=None):
+        """
+        Get file ids of paths, from the client cache or
+        with one request per parent folder (see WebDAV.get_files)
+
+        :returns: dict {path: (file_id, error)}
+        """
+        file_ids = {}
+        missing_paths = []
+        for path in paths:
+            file_id = self.client.file_id_cache.get_file_id(path)
+            if file_id is not None:
+                file_ids[path] = (file_id, None)
+            else:
+                missing_paths.append(path)
+        for path, (file_data, error) in self.client.get_files(
+                missing_paths, fields=['file_id'], max_workers=max_workers).items():
+            file_ids[path] = (file_data.file_id if file_data else None, error)
+        return file_ids
+
+    def bulk_tag(self, paths_or_ids, tag_ids, op='add', max_workers=None, rate_limit=None):
+        """
+        Add (or remove) tags to many files/folders, with concurrent requests
+
+        File ids of paths are resolved with one request per parent folder,
+        and each (file, tag) relation is requested once.
+
+        :param paths_or_ids (list): file ids (int), paths (str) or File objects
+        :param tag_ids (list): tag ids (int) or tag names (str)
+        :param op (str): 'add' or 'remove'
+        :param max_workers (int): max number of simultaneous requests
+        :param rate_limit (float): optional max number of requests per second
+
+        :returns: list of (item, tag_id, error) tuples, error being None if success
+        """
+        if op not in ('add', 'remove'):
+            raise ValueError("op shall be 'add' or 'remove'")
+        items = list(paths_or_ids)
+        _tag_ids = []
+        for tag in tag_ids:
+            if isinstance(tag, six.string_types):
+                tag_id = self._get_systemtag_id_from_name(tag)
+                if not tag_id:
+                    raise ValueError('No tag found (%s)' % tag)
+                tag = tag_id
+            _tag_ids.append(int(tag))
+
+        item_file_ids = []
+        for item in items:
+            file_id = item if isinstance(item, six.integer_types) else getattr(item, 'file_id', None)
+            path = item if isinstance(item, six.string_types) else None
+            if not file_id and path is None:
+                path = item.get_relative_path()
+            item_file_ids.append((file_id, path))
+        resolved = self._resolve_file_ids(
+            set(path for file_id, path in item_file_ids if not file_id),
+            max_workers=max_workers)
+
+        results = []
+        relations = {}
+        for idx, (file_id, path) in enumerate(item_file_ids):
+            error = None
+            if not file_id:
+                file_id, error = resolved[path]
+            for tag_id in _tag_ids:
+                if error:
+                    results.append((items[idx], tag_id, error))
+                else:
+                    relations.setdefault((file_id, tag_id), []).append(idx)
+
+        def _apply(relation):
+            url = '{}/{}'.format(*relation)
+            if op == 'add':
+                resp = self.requester.put(url=url)
+            else:
+                resp = self.requester.delete(url=url)
+            if not resp.is_ok:
+                webdav.WebDAV._raise_exception(resp, url)  # pylint: disable=protected-access
+            return resp
+
+        for relation, _resp, error in parallel.iter_concurrently(
+                _apply, list(relations), max_workers=max_workers, rate_limit=rate_limit):
+            for idx in relations[relation]:
+                results.append((items[idx], relation[1], error))
+        return results
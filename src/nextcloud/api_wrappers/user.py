@@ -6,6 +6,8 @@ See https://docs.nextcloud.com/server/14/admin_manual/configuration_user/instruc
     https://doc.owncloud.com/server/developer_manual/core/apis/provisioning-api.html
 """
 from nextcloud import base
+from nextcloud.common import parallel
+from nextcloud.exceptions import NextCloudError
 
 
 class User(base.ProvisioningApiWrapper):
@@ -48,6 +50,29 @@ class User(base.ProvisioningApiWrapper):
         """
         return self.requester.get(uid or self.client.user)
 
+    def get_users_details(self, uids, max_workers=None, rate_limit=None):
+        """
+        Retrieve information about many users, using concurrent requests
+
+        Details are yielded as soon as they are fetched (not in the order of uids).
+
+        :param uids: iterable of str, uids of users
+        :param max_workers: int, max number of simultaneous requests (default: 8)
+        :param rate_limit: float, optional max number of requests per second
+            (keep it low enough to not trigger the server brute-force protection)
+        :returns:  iterator of (uid, data, error) tuples ;
+            error is None if data was fetched, else a NextCloudError
+        """
+        def _get_user_data(uid):
+            resp = self.get_user(uid)
+            if not resp.is_ok:
+                raise NextCloudError(resp.get_error_message(), uid, resp)
+            return resp.data
+
+        return parallel.iter_concurrently(_get_user_data, uids,
+                                          max_workers=max_workers,
+                                          rate_limit=rate_limit)
+
     def get_connection_issues(self):
         """
         Return Falsy falue if everything is OK, or string representing
@@ -80,7 +105,7 @@ class User(base.ProvisioningApiWrapper):
         ]
         assert what in keys, (
             "You have chosen to edit user's '{what}', but you can choose only from: {choices}"
-            .format(what=what, choices=(keys()))
+            .format(what=what, choices=keys)
         )
         return self.requester.put(uid, data=dict(key=what, value=value))
 
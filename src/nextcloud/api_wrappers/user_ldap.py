@@ -5,7 +5,75 @@ See https://docs.nextcloud.com/server/14/admin_manual/configuration_user/user_au
     https://doc.owncloud.com/server/10.7/admin_manual/configuration/server/occ_commands/app_commands/ldap_integration_commands.html
 """
 import re
+import weakref
 from nextcloud import base
+from nextcloud.common import parallel
+from nextcloud.exceptions import NextCloudError
+
+
+# pylint: disable=useless-object-inheritance
+class LdapConfigSnapshot(object):
+    """
+    Snapshot of a LDAP configuration.
+
+    The configuration is fetched once, then getters read values from memory.
+    Setters are kept until commit(), which sends all changes in one request.
+    The snapshot is refreshed (at next read) after any configuration update
+    done by the client.
+
+    Example :
+    >>> snapshot = nxc.get_ldap_config_snapshot('s01')
+    >>> snapshot.get_ldap_host(), snapshot.get_ldap_port()
+    >>> snapshot.set_ldap_paging_size(500)
+    >>> snapshot.set_ldap_cache_ttl(600)
+    >>> snapshot.commit()
+    """
+
+    def __init__(self, wrapper, config_id, show_password=None):
+        self._wrapper = wrapper
+        self.config_id = config_id
+        self.show_password = show_password
+        self.changes = {}
+        self._data = None
+
+    @property
+    def data(self):
+        """ The configuration values (fetched if needed) """
+        if self._data is None:
+            resp = self._wrapper.get_ldap_config(self.config_id,
+                                                 show_password=self.show_password)
+            if not resp.is_ok:
+                raise NextCloudError(resp.get_error_message(), self.config_id, resp)
+            self._data = resp.data
+        return self._data
+
+    def __getitem__(self, key):
+        if key in self.changes:
+            return self.changes[key]
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.changes[key] = value
+
+    def invalidate(self):
+        """ Forget fetched values, they will be fetched again at next read """
+        self._data = None
+
+    def commit(self):
+        """
+        Send the changes
+
+        :returns: requester response (None if there is no change)
+        """
+        if not self.changes:
+            return None
+        resp = self._wrapper.edit_ldap_config(self.config_id, data=self.changes)
+        if resp.is_ok:
+            self.changes = {}
+        return resp
+
+    def __repr__(self):
+        return "<LdapConfigSnapshot: %s (%s changes)>" % (self.config_id, len(self.changes))
 
 
 class UserLDAP(base.OCSv2ApiWrapper):
@@ -66,8 +134,33 @@ class UserLDAP(base.OCSv2ApiWrapper):
         "ldapDefaultPPolicyDN",
     ]
 
+    def __init__(self, *args, **kwargs):
+        super(UserLDAP, self).__init__(*args, **kwargs)
+        self._snapshots = weakref.WeakSet()
+        self._lowest_config_ids = {}
+
+    def _invalidate_snapshots(self, config_id):
+        for snapshot in list(self._snapshots):
+            if snapshot.config_id == config_id:
+                snapshot.invalidate()
+
+    def get_ldap_config_snapshot(self, config_id, show_password=None):
+        """
+        Get a snapshot of the LDAP configuration (see LdapConfigSnapshot),
+        to read or update many keys with a single request
+
+        :param config_id (str): User LDAP config id
+        :param show_password (int): 0 or 1 whether to fetch the password in clear text
+
+        :returns: LdapConfigSnapshot
+        """
+        snapshot = LdapConfigSnapshot(self, config_id, show_password=show_password)
+        self._snapshots.add(snapshot)
+        return snapshot
+
     def create_ldap_config(self):
         """ Create a new and empty LDAP configuration """
+        self._lowest_config_ids.clear()
         return self.requester.post()
 
     def get_ldap_config_id(self, idx=1):
@@ -88,20 +181,51 @@ class UserLDAP(base.OCSv2ApiWrapper):
             return config_id
         return None
 
-    def get_ldap_lowest_existing_config_id(self, lower_bound=1, upper_bound=10):
+    def get_ldap_lowest_existing_config_id(self, lower_bound=1, upper_bound=10,
+                                           max_workers=None):
         """
         Given (inclusive) lower and upper bounds, try to guess an existing LDAP config ID
         that corresponds to an index within those bounds.
 
+        Indexes are probed with concurrent requests, and the result is kept
+        until a configuration is created or deleted with this client.
+
         :param lower_bound: The lowest index of the configuration possible.
         :param upper_bound: The greatest index of the configuration possible.
+        :param max_workers: max number of simultaneous requests (default: all indexes)
 
         :returns: Configuration string or None
         """
-        for idx in range(lower_bound, upper_bound + 1):
-            config_id = self.get_ldap_config_id(idx)
-            if config_id:
-                return config_id
+        bounds = (lower_bound, upper_bound)
+        if bounds in self._lowest_config_ids:
+            return self._lowest_config_ids[bounds]
+
+        indexes = list(range(lower_bound, upper_bound + 1))
+        config_ids = {}
+        lowest_config_id = None
+        probes = parallel.iter_concurrently(self.get_ldap_config_id, indexes,
+                                            max_workers=max_workers or len(indexes))
+        try:
+            for idx, config_id, error in probes:
+                if error:
+                    raise error
+                config_ids[idx] = config_id
+                # the lowest is known once every lower index is probed
+                for lower_idx in indexes:
+                    if lower_idx not in config_ids:
+                        break
+                    if config_ids[lower_idx]:
+                        lowest_config_id = config_ids[lower_idx]
+                        break
+                else:
+                    break
+                if lowest_config_id:
+                    break
+        finally:
+            probes.close()
+
+        self._lowest_config_ids[bounds] = lowest_config_id
+        return lowest_config_id
 
     def get_ldap_config(self, config_id, show_password=None):
         """
@@ -128,9 +252,11 @@ class UserLDAP(base.OCSv2ApiWrapper):
         :returns: requester response
         """
         prepared_data = {'configData[{}]'.format(key): value for key, value in data.items()}
-        return self.requester.put(config_id, data=prepared_data)
+        resp = self.requester.put(config_id, data=prepared_data)
+        self._invalidate_snapshots(config_id)
+        return resp
 
-    def ldap_cache_flush(self, config_id):
+    def ldap_cache_flush(self, config_id, snapshot=None):
         """
         Flush the cache, so the fresh LDAP DB data is used.
 
@@ -139,9 +265,14 @@ class UserLDAP(base.OCSv2ApiWrapper):
         as indicated by
 
         :param config_id (str): User LDAP config id
+        :param snapshot (LdapConfigSnapshot): snapshot of the configuration, if
+            already fetched, the cache TTL is not fetched again
+
+        :returns: requester response
         """
-        cache_val = self.get_ldap_cache_ttl(config_id)
-        self.set_ldap_cache_ttl(config_id, cache_val)
+        snapshot = snapshot or self.get_ldap_config_snapshot(config_id)
+        return self.edit_ldap_config(config_id,
+                                     data={'ldapCacheTTL': snapshot['ldapCacheTTL']})
 
     def delete_ldap_config(self, config_id):
         """
@@ -151,7 +282,10 @@ class UserLDAP(base.OCSv2ApiWrapper):
 
         :returns: requester response
         """
-        return self.requester.delete(config_id)
+        resp = self.requester.delete(config_id)
+        self._invalidate_snapshots(config_id)
+        self._lowest_config_ids.clear()
+        return resp
 
 
 for ldap_key in UserLDAP.CONFIG_KEYS:
@@ -182,3 +316,20 @@ for ldap_key in UserLDAP.CONFIG_KEYS:
         return setter
 
     setattr(UserLDAP, setter_name, setter_method(ldap_key))
+
+    # add getter and setter to the snapshot (without config_id argument)
+    def snapshot_getter_method(param):
+        def getter(self):
+            return self[param]
+        getter.__name__ = getter_name
+        return getter
+
+    setattr(LdapConfigSnapshot, getter_name, snapshot_getter_method(ldap_key))
+
+    def snapshot_setter_method(param):
+        def setter(self, value):
+            self[param] = value
+        setter.__name__ = setter_name
+        return setter
+
+    setattr(LdapConfigSnapshot, setter_name, snapshot_setter_method(ldap_key))
@@ -14,21 +14,26 @@ Not implemented yet:
 # implementing dav search
 # -> add a function to build xml search
 #   see ../common/build_xml.py and ../api/model.py
+import functools
+import io
 import re
 import os
+from collections import OrderedDict
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from ..base import WebDAVApiWrapper
 from ..codes import WebDAVCode
 from ..exceptions import NextCloudError
 from ..api.model import Item
+from ..api.item_set import ItemSet
 from ..api.properties import NAMESPACES_MAP, DProp, OCProp, NCProp
 from ..common.timestamping import (
     timestamp_from_string,
     datetime_from_string,
     timestamp_from_datetime
 )
-from ..common.paths import sequenced_paths_list
+from ..common import parallel, streams
+from ..common.paths import sequenced_paths_list, parent_paths, split_path
 from ..compat import unquote
 
 
@@ -109,9 +114,16 @@ class File(Item):
     href = OCProp(parse_value=unquote)
     has_preview = NCProp()
 
+    @staticmethod
+    def _extract_checksums(file_property):
+        checksum = file_property.find('oc:checksum', NAMESPACES_MAP)
+        return checksum.text if checksum is not None else None
+
     # check_sums actually returns None
+    # (unless the file was uploaded with a OC-Checksum header)
     # see https://github.com/nextcloud/server/issues/6129
-    check_sums = OCProp('checksums', disabled=True)
+    check_sums = OCProp('checksums', disabled=True,
+                        parse_xml_value='_extract_checksums')
 
 
     def isfile(self):
@@ -151,6 +163,16 @@ class File(Item):
     def __eq__(self, file_data):
         return self.href == file_data.href
 
+    @classmethod
+    def _on_parsed(cls, items, wrapper):
+        # feed the path <-> file id cache of the client
+        cache = getattr(getattr(wrapper, 'client', None), 'file_id_cache', None)
+        if cache is None:
+            return
+        for item in items:
+            if item.file_id is not None and item.href:
+                cache.put(item.get_relative_path(), item.file_id, item.etag)
+
     # MINIMAL SET OF CRUD OPERATIONS
     def get_folder(self, path=None, all_properties=False):
         """
@@ -185,8 +207,7 @@ class File(Item):
         """
         if self.isdir():
             raise ValueError("This is a collection, please specify file path")
-        resp = self._wrapper.requester.download(
-            self._wrapper.client.user + self.get_relative_path())
+        resp = self._wrapper.download_content(self.get_relative_path())
         if not resp.is_ok:
             raise NextCloudError(resp.get_error_message(), resp.raw.request.url, resp)
         return resp.data
@@ -217,6 +238,21 @@ class File(Item):
             return _dirs
         return []
 
+    def open(self, mode='rb', **kwargs):
+        """
+        Open the file for reading, without downloading it (see RemoteFile)
+        :param mode: only 'rb' is supported
+        :param kwargs: RemoteFile options (block_size, cache_blocks, max_read_ahead)
+        :returns: RemoteFile (io.RawIOBase)
+        """
+        if mode not in ('r', 'rb'):
+            raise ValueError("Only 'rb' mode is supported")
+        if self.isdir():
+            raise ValueError("This is a collection, please specify file path")
+        size = self.content_length
+        return RemoteFile(self._wrapper, self.get_relative_path(), size=size,
+                          etag=self.etag if size is not None else None, **kwargs)
+
     def upload_file(self, local_filepath, name, timestamp=None):
         """
         Upload file (see WebDav wrapper)
@@ -233,7 +269,8 @@ class File(Item):
     def upload_file_contents(self, file_contents, name=None, timestamp=None):
         """
         Upload file content (see WebDav wrapper)
-        :param file_contents: binary content of the file
+        :param file_contents: binary content of the file (bytes, buffer,
+                              binary file-like object or iterable of bytes)
         :param name: name of the new file (current file if empty)
         :param timestamp (int):  mtime of upload file
         :returns: True if success
@@ -277,15 +314,142 @@ class File(Item):
         """
         if recursive:
             resp = self._wrapper.delete_path(self._get_remote_path(subpath))
-        else:
-            if subpath:
-                _file = self.get_file(subpath, all_properties=False)
-                return _file.delete(recursive=recursive)
-            if not self.isempty():
-                raise NextCloudDirectoryNotEmpty(self.get_relative_path())
-            return self.delete(recursive=True)
+            return resp.is_ok
+        [(_path, error)] = self._wrapper.delete_paths([self._get_remote_path(subpath)])
+        if isinstance(error, NextCloudDirectoryNotEmpty):
+            raise error
+        return error is None
+
+
+# pylint: disable=too-many-instance-attributes
+class RemoteFile(io.RawIOBase):
+    """
+    Read-only and seekable remote file, read with HTTP Range requests
+    (see WebDAV.open_file or File.open)
+
+    The blocks read are kept in memory (LRU). When the file is read
+    sequentially, more and more blocks are requested at once (read-ahead).
+    If the server ignores Range requests, the whole content received with
+    the first request is kept in memory and no other request is done.
+
+    Example :
+    >>> with nxc.open_file('archive.zip') as remote_file:
+    >>>     print(zipfile.ZipFile(remote_file).namelist())
+
+    :param wrapper:        WebDAV wrapper
+    :param path:           file path
+    :param size:           file size (fetched if None)
+    :param etag:           etag of the file : reading fails if the file changes
+                           (fetched with size if None)
+    :param block_size:     size of the requested blocks
+    :param cache_blocks:   number of blocks kept in memory
+    :param max_read_ahead: max number of blocks requested at once
+    """
 
-        return resp.is_ok
+    # pylint: disable=too-many-arguments
+    def __init__(self, wrapper, path, size=None, etag=None, block_size=64 * 1024,
+                 cache_blocks=64, max_read_ahead=16):
+        super(RemoteFile, self).__init__()
+        if size is None:
+            file_data = wrapper.get_file(path, fields=['content_length', 'etag'])
+            if not file_data:
+                raise NextCloudError('File not found', path)
+            size, etag = file_data.content_length, etag or file_data.etag
+        self.path = path
+        self.size = int(size)
+        self.etag = etag
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, max_read_ahead)
+        self.max_read_ahead = max_read_ahead
+        self.bytes_transferred = 0
+        self._wrapper = wrapper
+        self._position = 0
+        self._blocks = OrderedDict()
+        self._content = None  # whole content, if Range is not supported
+        self._last_block = None
+        self._read_ahead = 1
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError('Negative seek position %d' % offset)
+        self._position = offset
+        return offset
+
+    def _fetch_blocks(self, first, count):
+        start = first * self.block_size
+        end = min((first + count) * self.block_size, self.size) - 1
+        headers = {'Range': 'bytes=%d-%d' % (start, end), 'Accept-Encoding': 'identity'}
+        if self.etag:
+            headers['If-Match'] = self.etag
+        # pylint: disable=protected-access
+        resp = self._wrapper.requester.download(self._wrapper._get_path(self.path),
+                                                headers=headers)
+        if resp.status_code == WebDAVCode.OK:
+            # Range not supported : whole content, kept to not download it again
+            self._content = resp.data
+            self._blocks.clear()
+        elif resp.status_code != WebDAVCode.PARTIAL_CONTENT:
+            self._wrapper._raise_exception(resp, self.path)
+        data = resp.data
+        self.bytes_transferred += len(data)
+        if self._content is not None:
+            return
+        for idx in range(count):
+            self._blocks[first + idx] = data[idx * self.block_size:(idx + 1) * self.block_size]
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+
+    def _get_block(self, idx):
+        if self._content is not None:
+            return self._content[idx * self.block_size:(idx + 1) * self.block_size]
+        block = self._blocks.pop(idx, None)
+        if block is None:
+            if self._last_block is not None and idx == self._last_block + 1:
+                self._read_ahead = min(self._read_ahead * 2, self.max_read_ahead)
+            else:
+                self._read_ahead = 1
+            count = 1
+            last = (self.size - 1) // self.block_size
+            while (count < self._read_ahead and idx + count <= last
+                   and idx + count not in self._blocks):
+                count += 1
+            self._fetch_blocks(idx, count)
+            if self._content is not None:
+                return self._get_block(idx)
+            block = self._blocks.pop(idx)
+        self._blocks[idx] = block
+        self._last_block = idx
+        return block
+
+    def readinto(self, buf):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        total = 0
+        while total < len(buf) and self._position < self.size:
+            idx, offset = divmod(self._position, self.block_size)
+            chunk = self._get_block(idx)[offset:offset + len(buf) - total]
+            buf[total:total + len(chunk)] = chunk
+            total += len(chunk)
+            self._position += len(chunk)
+        return total
+
+    def close(self):
+        self._blocks.clear()
+        self._content = None
+        super(RemoteFile, self).close()
 
 
 class WebDAV(WebDAVApiWrapper):
@@ -308,6 +472,18 @@ class WebDAV(WebDAVApiWrapper):
             return '/'.join([self.client.user, path]).replace('//', '/')
         return self.client.user
 
+    def _get_content_key(self, path):
+        return ''.join([self.client.url, self.API_URL, '/', self._get_path(path)])
+
+    def _invalidate_caches(self, *paths):
+        """ Forget cached data of changed paths """
+        for path in paths:
+            self.client.file_id_cache.invalidate(path)
+            if self.client.metadata_cache is not None:
+                self.client.metadata_cache.invalidate(path)
+            if self.client.content_cache is not None:
+                self.client.content_cache.invalidate(self._get_content_key(path))
+
     def list_folders(self, path=None, depth=1, all_properties=False,
                      fields=None):
         """
@@ -322,17 +498,93 @@ class WebDAV(WebDAVApiWrapper):
 
         Returns:
             list of File objects
+
+        Note :
+            if the client has a metadata cache (see MetadataCache),
+            listings are taken from the cache when they didn't change
         """
         # if not all_properties and not fields:
         #     fields = ['file_id', 'resource_type']
+        cache = self.client.metadata_cache
+        if cache is not None and not all_properties and not isinstance(fields, dict):
+            # fetch etag, to be able to revalidate the listing
+            # pylint: disable=protected-access
+            fields = list(fields or [attr.attr_name for attr in File._attrs if attr.required])
+            if 'etag' not in fields:
+                fields.append('etag')
+        data = File.build_xml_propfind(
+            use_default=all_properties,
+            fields=fields
+        )
+        if cache is None:
+            resp = self.requester.propfind(self._get_path(path),
+                                           headers={'Depth': str(depth)},
+                                           data=data)
+            return File.from_response(resp, wrapper=self)
+        return self._cached_propfind(cache, path, depth, data)
+
+    def iter_folders(self, path=None, depth=1, all_properties=False, fields=None):
+        """
+        Iterate over path files with files properties with given depth
+        (for current user), the PROPFIND response being decompressed and
+        parsed while it is received, so that a huge listing is read in
+        bounded memory (see list_folders)
+
+        Args:
+            path (str/None): files path
+            depth (int): depth of listing files (directories content for example)
+            all_properties (bool): list all available file properties in Nextcloud
+            fields (str list): file properties to fetch
+
+        Returns:
+            iterator of File objects
+
+        Note :
+            the metadata cache of the client is not used
+        """
         data = File.build_xml_propfind(
             use_default=all_properties,
             fields=fields
         )
+        resp = self.requester.propfind(self._get_path(path),
+                                       headers={'Depth': str(depth)},
+                                       data=data, stream=True)
+        try:
+            if not resp.is_ok:
+                self._raise_exception(resp, path)
+            for file_data in File.iter_from_xml(resp.get_stream(), wrapper=self):
+                yield file_data
+        finally:
+            resp.close()
+
+    def _cached_propfind(self, cache, path, depth, data):
+        """ list_folders using the metadata cache (see MetadataCache) """
+        key = ((path or '').strip('/'), str(depth), data)
+        cached = cache.get(key)
+        if cached is not None:
+            is_fresh, etag, raw, files = cached
+            if not is_fresh and cache.revalidate and etag:
+                etag_resp = self.get_file_property(path, 'd:getetag')
+                is_fresh = etag_resp.is_ok and etag_resp.data == etag
+                if is_fresh:
+                    cache.touch(key)
+                    cache.count('revalidations')
+            if is_fresh:
+                cache.count('hits')
+                # not parsed again : cached files don't feed the file id cache
+                resp = self.requester.rtn(raw)
+                resp.data = ItemSet(File, list(files))
+                return resp
+        cache.count('misses')
         resp = self.requester.propfind(self._get_path(path),
                                        headers={'Depth': str(depth)},
                                        data=data)
-        return File.from_response(resp, wrapper=self)
+        raw = resp.raw
+        resp = File.from_response(resp, wrapper=self)
+        if resp.is_ok:
+            etag = resp.data[0].etag if resp.data else None
+            cache.set(key, etag, raw, len(raw.content), items=list(resp.data))
+        return resp
 
     def download_file(self, path, target=None, overwrite=None):
         """
@@ -380,7 +632,54 @@ class WebDAV(WebDAVApiWrapper):
                 file_timestamp))
         return (target, file_data)
 
-    def upload_file(self, local_filepath, remote_filepath, timestamp=None):
+    def open_file(self, path, **kwargs):
+        """
+        Open a remote file for reading, without downloading it :
+        parts of the file are requested when they are read
+
+        Args:
+            path (str): file path
+            kwargs: RemoteFile options (block_size, cache_blocks, max_read_ahead)
+
+        Returns:
+            RemoteFile (seekable io.RawIOBase)
+        """
+        return RemoteFile(self, path, **kwargs)
+
+    def download_content(self, path):
+        """
+        Download file content (for current user)
+
+        If the client has a content cache (see ContentCache), the content
+        is only transferred if it changed since it was saved in the cache.
+
+        Args:
+            path (str): file path
+
+        Returns:
+            requester response with content (bytes) in data
+        """
+        cache = self.client.content_cache
+        if cache is None:
+            return self.requester.download(self._get_path(path))
+        key = self._get_content_key(path)
+        etag = cache.get_etag(key)
+        resp = self.requester.download(
+            self._get_path(path), headers={'If-None-Match': etag} if etag else None)
+        if etag and resp.status_code == WebDAVCode.NOT_MODIFIED:
+            content = cache.read(key, etag)
+            if content is None:
+                # content removed from the cache meanwhile
+                return self.requester.download(self._get_path(path))
+            resp.data = content
+            resp.is_ok = True
+        elif resp.is_ok:
+            cache.set(key, resp.raw.headers.get('ETag'), resp.data)
+        return resp
+
+    # pylint: disable=too-many-arguments
+    def upload_file(self, local_filepath, remote_filepath, timestamp=None,
+                    if_match=None, if_none_match=None, skip_unchanged=False):
         """
         Upload file to Nextcloud storage
 
@@ -388,30 +687,94 @@ class WebDAV(WebDAVApiWrapper):
             local_filepath (str): path to file on local storage
             remote_filepath (str): path where to upload file on Nextcloud storage
             timestamp (int): timestamp of upload file. If None, get time by local file.
+            if_match, if_none_match, skip_unchanged: see upload_file_contents
 
         Returns:
             requester response
         """
-        with open(local_filepath, 'rb') as f:
-            file_contents = f.read()
         if timestamp is None:
             timestamp = int(os.path.getmtime(local_filepath))
-        return self.upload_file_contents(file_contents, remote_filepath, timestamp)
+        with open(local_filepath, 'rb') as f:
+            # the file is streamed, not loaded in memory
+            return self.upload_file_contents(f, remote_filepath, timestamp,
+                                             if_match=if_match, if_none_match=if_none_match,
+                                             skip_unchanged=skip_unchanged)
 
-    def upload_file_contents(self, file_contents, remote_filepath, timestamp=None):
+    def _fetch_unchanged_file(self, remote_filepath, size, checksum, timestamp):
+        """
+        Get the remote file if its content is the same as the local one
+        (same SHA1 checksum, or same size and mtime if the checksum is unknown)
+
+        :returns: requester response with File in data, or None if changed
+        """
+        data = File.build_xml_propfind(fields={
+            'd': ['getetag', 'getcontentlength', 'getlastmodified'],
+            'oc': ['checksums'],
+        })
+        resp = File.from_response(
+            self.requester.propfind(self._get_path(remote_filepath),
+                                    headers={'Depth': '0'}, data=data),
+            wrapper=self, multi=False)
+        file_data = resp.data
+        if not resp.is_ok or not file_data:
+            return None
+        checksums = (file_data.check_sums or '').upper().split()
+        if any(value.startswith('SHA1:') for value in checksums):
+            unchanged = checksum.upper() in checksums
+        else:
+            unchanged = (
+                timestamp is not None and size is not None and
+                str(file_data.content_length) == str(size) and
+                timestamp_from_string(file_data.last_modified) == int(timestamp)
+            )
+        return resp if unchanged else None
+
+    def upload_file_contents(self, file_contents, remote_filepath, timestamp=None,
+                             if_match=None, if_none_match=None, skip_unchanged=False):
         """
         Upload file to Nextcloud storage
 
         Args:
-            file_contents (bytes): Bytes the file to be uploaded consists of
+            file_contents: content of the file, streamed without copy :
+                           bytes, buffer (bytearray, memoryview, mmap…),
+                           file-like object opened in binary mode,
+                           or iterable of bytes (sent with chunked transfer-encoding)
             remote_filepath (str): path where to upload file on Nextcloud storage
             timestamp (int):  mtime of upload file
+            if_match (str): only upload if the remote file has this etag
+                            (i.e. nobody changed it since it was read)
+            if_none_match (str): '*' to only upload if the remote file doesn't exist
+            skip_unchanged (bool): don't upload if the remote file has the same
+                                   content (same SHA1 checksum, or same size
+                                   and mtime when checksums are not available),
+                                   not available for iterables
 
         Returns:
-            requester response
+            requester response (status 412 if a condition is not met),
+            or the PROPFIND response (status 207) with the remote File in data
+            if the upload was skipped
         """
+        headers = {}
+        if if_match:
+            headers['If-Match'] = if_match
+        if if_none_match:
+            headers['If-None-Match'] = if_none_match
+        if skip_unchanged:
+            checksum = 'SHA1:' + streams.get_sha1(file_contents)
+            resp = self._fetch_unchanged_file(remote_filepath, streams.get_size(file_contents),
+                                              checksum, timestamp)
+            if resp is not None:
+                return resp
+            # saved by the server, for the next comparisons
+            headers['OC-Checksum'] = checksum
         resp = self.requester.put_with_timestamp(
-            self._get_path(remote_filepath), data=file_contents, timestamp=timestamp)
+            self._get_path(remote_filepath), data=streams.get_body(file_contents),
+            timestamp=timestamp, headers=headers)
+        self._invalidate_caches(remote_filepath)
+        if (resp.is_ok and self.client.content_cache is not None
+                and isinstance(file_contents, bytes)):
+            self.client.content_cache.set(self._get_content_key(remote_filepath),
+                                          resp.raw.headers.get('ETag'), file_contents)
         return resp
 
     def create_folder(self, folder_path, already_exists=False):
@@ -426,6 +789,7 @@ class WebDAV(WebDAVApiWrapper):
             requester response
         """
         ret = self.requester.make_collection(self._get_path(folder_path))
+        self._invalidate_caches(folder_path)
         if already_exists and not ret.is_ok:
             if ret.status_code == WebDAVCode.ALREADY_EXISTS:
                 ret.is_ok = True
@@ -482,7 +846,91 @@ class WebDAV(WebDAVApiWrapper):
         Returns:
             requester response
         """
-        return self.requester.delete(url=self._get_path(path))
+        resp = self.requester.delete(url=self._get_path(path))
+        self._invalidate_caches(path)
+        return resp
+
+    def _delete_checked_path(self, path, file_data, size_changed=False):
+        # size_changed : some content of the folder was deleted since file_data
+        if file_data.isdir() and not size_changed and str(file_data.size) != '0':
+            raise NextCloudDirectoryNotEmpty('Directory not empty', path)
+        if file_data.isdir():
+            # folder of size 0 : may contain empty folders
+            # (not from the metadata cache : the folder may have changed)
+            resp = File.from_response(self.requester.propfind(
+                self._get_path(path), headers={'Depth': '1'},
+                data=File.build_xml_propfind(fields=['resource_type'])), wrapper=self)
+            if not resp.is_ok:
+                self._raise_exception(resp, path)
+            if len(resp.data) > 1:
+                raise NextCloudDirectoryNotEmpty('Directory not empty', path)
+        return self._delete_checked_path_request(path)
+
+    def _delete_checked_path_request(self, path):
+        resp = self.delete_path(path)
+        if not resp.is_ok:
+            self._raise_exception(resp, path)
+        return resp
+
+    def delete_paths(self, paths, recursive=False, max_workers=None, rate_limit=None):
+        """
+        Delete many files or folders, with concurrent requests
+
+        Unless recursive is True, folders are only deleted if they are empty :
+        they are checked with one listing per parent folder (see get_files),
+        and another listing for the folders of size 0 (the metadata cache
+        is not used). Paths are deleted before their parent folders.
+
+        Args:
+            paths (list): file or folder paths to delete
+            recursive (bool): delete folders with their content, without check
+            max_workers (int): max number of simultaneous requests
+            rate_limit (float): optional max number of requests per second
+
+        Returns:
+            list of (path, error) tuples (in the given order), error being
+            None if success, or a NextCloudError (e.g. NextCloudDirectoryNotEmpty)
+        """
+        paths = list(paths)
+        keys = [path.strip('/') for path in paths]
+        unique_keys = list(OrderedDict.fromkeys(keys))
+        errors = {}
+        files = {}
+        if recursive:
+            # the content of deleted folders is deleted with them
+            to_delete = [key for key in unique_keys if not any(
+                parent in unique_keys for parent in parent_paths(key))]
+        else:
+            for key, (file_data, error) in self.get_files(
+                    unique_keys, fields=['resource_type', 'size'],
+                    max_workers=max_workers, use_cache=False).items():
+                if error:
+                    errors[key] = error
+                else:
+                    files[key] = file_data
+            to_delete = list(files)
+        # deepest paths first : folders are checked once their content is deleted
+        by_depth = {}
+        for key in to_delete:
+            by_depth.setdefault(key.count('/'), []).append(key)
+        size_changed = set(parent for key in to_delete for parent in parent_paths(key))
+
+        def _delete(key):
+            if recursive:
+                return self._delete_checked_path_request(key)
+            return self._delete_checked_path(key, files[key], key in size_changed)
+
+        for depth in sorted(by_depth, reverse=True):
+            for key, _resp, error in parallel.iter_concurrently(
+                    _delete, by_depth[depth], max_workers=max_workers, rate_limit=rate_limit):
+                errors[key] = error
+        results = []
+        for path, key in zip(paths, keys):
+            if key not in errors:
+                # deleted with its parent folder
+                key = [parent for parent in parent_paths(key) if parent in errors][-1]
+            results.append((path, errors[key]))
+        return results
 
     def move_path(self, path, destination_path, overwrite=False):
         """
@@ -496,10 +944,11 @@ class WebDAV(WebDAVApiWrapper):
         Returns:
             requester response
         """
-        return self.requester.move(url=self._get_path(path),
-                                   destination=self._get_path(
-                                       destination_path),
+        resp = self.requester.move(url=self._get_path(path),
+                                   destination=self._get_path(destination_path),
                                    overwrite=overwrite)
+        self._invalidate_caches(path, destination_path)
+        return resp
 
     def copy_path(self, path, destination_path, overwrite=False):
         """
@@ -513,10 +962,95 @@ class WebDAV(WebDAVApiWrapper):
         Returns:
             requester response
         """
-        return self.requester.copy(url=self._get_path(path),
-                                   destination=self._get_path(
-                                       destination_path),
+        resp = self.requester.copy(url=self._get_path(path),
+                                   destination=self._get_path(destination_path),
                                    overwrite=overwrite)
+        self._invalidate_caches(destination_path)
+        return resp
+
+    # pylint: disable=too-many-locals
+    def _transfer_paths(self, method, pairs, overwrite, max_workers, rate_limit):
+        pairs = [(src.strip('/'), dst.strip('/')) for src, dst in pairs]
+
+        # create the destination folders that are not created by previous transfers
+        destinations = set()
+        folders = set()
+        for _src, dst in pairs:
+            parents = parent_paths(dst)
+            if parents and not any(parent in destinations for parent in parents):
+                folders.add(parents[0])
+            destinations.add(dst)
+        if folders:
+            self.ensure_tree_exists(sorted(folders))
+
+        # a transfer waits for the previous ones on the same paths,
+        # on their parent folders or on their content
+        exact = {}   # path: transfers on this path
+        inside = {}  # path: transfers on this path or under it
+        tasks = []
+        for idx, (src, dst) in enumerate(pairs):
+            deps = set()
+            for path in (src, dst):
+                deps.update(inside.get(path, ()))
+                for parent in parent_paths(path):
+                    deps.update(exact.get(parent, ()))
+            for path in (src, dst):
+                exact.setdefault(path, set()).add(idx)
+                for node in [path] + parent_paths(path):
+                    inside.setdefault(node, set()).add(idx)
+            tasks.append((idx, functools.partial(self._transfer_path, method, src, dst,
+                                                 overwrite),
+                          sorted(deps)))
+
+        results = [None] * len(pairs)
+        for idx, _resp, error in parallel.run_tasks(tasks, max_workers=max_workers,
+                                                    rate_limit=rate_limit):
+            results[idx] = pairs[idx] + (error,)
+        return results
+
+    def _transfer_path(self, method, src, dst, overwrite):
+        resp = getattr(self, method)(src, dst, overwrite=overwrite)
+        if not resp.is_ok:
+            self._raise_exception(resp, src)
+        return resp
+
+    def move_paths(self, pairs, overwrite=False, max_workers=None, rate_limit=None):
+        """
+        Move many files or folders, with concurrent requests
+
+        The destination folders are created first. Moves of independent
+        paths are done concurrently, the others (same path, parent folder
+        or content of a moved folder) are done in the given order.
+
+        Args:
+            pairs (list): (path, destination_path) tuples
+            overwrite (bool): allow destination path overriding
+            max_workers (int): max number of simultaneous requests
+            rate_limit (float): optional max number of requests per second
+
+        Returns:
+            list of (path, destination_path, error) tuples (in the given order),
+            error being None if success, or a NextCloudError
+            (e.g. NextCloudFileConflict, see EXCEPTIONS)
+        """
+        return self._transfer_paths('move_path', pairs, overwrite, max_workers, rate_limit)
+
+    def copy_paths(self, pairs, overwrite=False, max_workers=None, rate_limit=None):
+        """
+        Copy many files or folders, with concurrent requests
+
+        (see move_paths)
+
+        Args:
+            pairs (list): (path, destination_path) tuples
+            overwrite (bool): allow destination path overriding
+            max_workers (int): max number of simultaneous requests
+            rate_limit (float): optional max number of requests per second
+
+        Returns:
+            list of (path, destination_path, error) tuples (in the given order)
+        """
+        return self._transfer_paths('copy_path', pairs, overwrite, max_workers, rate_limit)
 
     def set_file_property(self, path, update_rules):
         """
@@ -534,7 +1068,9 @@ class WebDAV(WebDAVApiWrapper):
             check object property xml_name for property name
         """
         data = File.build_xml_propupdate(update_rules)
-        return self.requester.proppatch(self._get_path(path), data=data)
+        resp = self.requester.proppatch(self._get_path(path), data=data)
+        self._invalidate_caches(path)
+        return resp
 
     def fetch_files_with_filter(self, path='', filter_rules=''):
         """
@@ -556,6 +1092,61 @@ class WebDAV(WebDAVApiWrapper):
         resp = self.requester.report(self._get_path(path), data=data)
         return File.from_response(resp, wrapper=self)
 
+    def iter_files_with_filter(self, path='', filter_rules='', page_size=500, fields=None):
+        """
+        List files according to a filter, page by page,
+        so that a huge list of files can be read in bounded memory
+
+        Args:
+            path (str): file or folder path to search
+            filter_rules : a dict { namespace: {key : value } }
+            page_size (int): number of files fetched per request
+            fields (str list): file properties to fetch
+
+        Returns:
+            iterator of File objects
+
+        Note :
+            servers that don't support REPORT pagination return all
+            the files at first request ; servers ignoring the offset
+            (same first page again) are requested once without pagination
+        """
+        offset = 0
+        first_page_hrefs = set()
+        while True:
+            data = File.build_xml_propfind(
+                instr='oc:filter-files', filter_rules=filter_rules, fields=fields,
+                limit=page_size, offset=offset)
+            count = 0
+            for file_data in self._iter_report(path, data):
+                if offset == page_size and not count and file_data.href in first_page_hrefs:
+                    # offset not supported : all the files, without the first page
+                    data = File.build_xml_propfind(
+                        instr='oc:filter-files', filter_rules=filter_rules, fields=fields)
+                    for other_data in self._iter_report(path, data):
+                        if other_data.href not in first_page_hrefs:
+                            yield other_data
+                    return
+                if not offset:
+                    first_page_hrefs.add(file_data.href)
+                count += 1
+                yield file_data
+            if count != page_size:
+                # last page, or pagination not supported (all files in one page)
+                return
+            offset += page_size
+
+    def _iter_report(self, path, data):
+        """ REPORT request, the response being parsed while it is received """
+        resp = self.requester.report(self._get_path(path), data=data, stream=True)
+        try:
+            if not resp.is_ok:
+                self._raise_exception(resp, path)
+            for file_data in File.iter_from_xml(resp.get_stream(), wrapper=self):
+                yield file_data
+        finally:
+            resp.close()
+
     def set_favorites(self, path):
         """
         Set files of a user favorite
@@ -627,6 +1218,45 @@ class WebDAV(WebDAVApiWrapper):
                 return resp.data[0]
         return None
 
+    def get_files(self, paths, fields=None, max_workers=None, use_cache=True):
+        """
+        Return the File objects associated to many paths, with one request
+        per parent folder (or per path if it is alone in its folder)
+
+        :param paths: paths to the files
+        :param fields: file properties to fetch
+        :param max_workers: max number of simultaneous requests
+        :param use_cache: use the metadata cache of the client (see list_folders)
+        :returns: dict {path: (File object or None, error or None)}
+        """
+        by_parent = {}
+        for path in paths:
+            parent, _name = split_path(path.strip('/'))
+            by_parent.setdefault(parent, []).append(path)
+
+        def _list_parent(parent):
+            children = by_parent[parent]
+            path, depth = (children[0], 0) if len(children) == 1 else (parent, 1)
+            if use_cache:
+                resp = self.client.list_folders(path, depth=depth, fields=fields)
+            else:
+                resp = File.from_response(self.requester.propfind(
+                    self._get_path(path), headers={'Depth': str(depth)},
+                    data=File.build_xml_propfind(fields=fields)), wrapper=self)
+            if not resp.is_ok and resp.status_code != WebDAVCode.NOT_FOUND:
+                self._raise_exception(resp, parent)
+            return {_file.get_relative_path().strip('/'): _file
+                    for _file in resp.data or []}
+
+        files = {}
+        for parent, found, error in parallel.iter_concurrently(
+                _list_parent, list(by_parent), max_workers=max_workers):
+            for path in by_parent[parent]:
+                file_data = (found or {}).get(path.strip('/'))
+                files[path] = (file_data, error or (
+                    None if file_data else NextCloudError('File not found', path)))
+        return files
+
     def get_folder(self, path=None, all_properties=False, fields=None):
         """
         Return the File object associated to the path
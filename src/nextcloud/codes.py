@@ -54,6 +54,7 @@ class OCSCode:
     """ HTTP codes values for OCS API """
     SUCCESS_V1 = 100
     SUCCESS_V2 = 200
+    NOT_MODIFIED = 304  # no new data (e.g. activities since a given id)
     FAILURE = 400
     NOT_FOUND = 404
     SYNC_CONFLICT = 409
@@ -64,8 +65,11 @@ class WebDAVCode:
     OK = 200
     CREATED = 201  # file / folder creation succes
     NO_CONTENT = 204
+    PARTIAL_CONTENT = 206  # Range request
     MULTISTATUS = 207
+    NOT_MODIFIED = 304  # conditional request, the cached content can be used
     NOT_AUTHENTICATED = 401
+    NOT_FOUND = 404
     ALREADY_EXISTS = 405  # folder already exists
     CONFLICT = 409  # apply if parent folder doesn't exists
     PRECONDITION_FAILED = 412
@@ -40,7 +40,8 @@ def _to_field_vals_list(fields_hash):
 def _tostring(root):
     return ET.tostring(root)
 
-def build_propfind_datas(instr=None, filter_rules=None, fields=None):
+def build_propfind_datas(instr=None, filter_rules=None, fields=None,
+                         limit=None, offset=None):
     """
     Build XML datas for a PROPFIND querry.
 
@@ -49,6 +50,8 @@ def build_propfind_datas(instr=None, filter_rules=None, fields=None):
                          namespace. e.g. {'oc': {'favorite': 1}}
     :param fields:       a dict containing fields separated by namespace
                          e.g. {'oc': ['id']}
+    :param limit:        max number of results (for REPORT pagination)
+    :param offset:       index of the first result (for REPORT pagination)
     :returns:            xml data (string)
     """
     if not instr:
@@ -70,6 +73,9 @@ def build_propfind_datas(instr=None, filter_rules=None, fields=None):
                 continue
             _namespaces[k] = XML_NAMESPACES_MAP[k]
 
+    if limit and offset:
+        # the offset is read in the Nextcloud namespace only
+        _namespaces = dict(_namespaces, **{'xmlns:nc': XML_NAMESPACES_MAP['xmlns:nc']})
     root = ET.Element(instr, _namespaces)
     props = _to_fields_list(fields)
     if props:
@@ -85,6 +91,12 @@ def build_propfind_datas(instr=None, filter_rules=None, fields=None):
             val = rules[k]
             rule.text = _safe_xml_val(val)
 
+    if limit:
+        limit_group = ET.SubElement(root, 'd:limit')
+        ET.SubElement(limit_group, 'd:nresults').text = _safe_xml_val(limit)
+        if offset:
+            ET.SubElement(limit_group, 'nc:firstresult').text = _safe_xml_val(offset)
+
     return _tostring(root)
 
 def build_propupdate_datas(values):
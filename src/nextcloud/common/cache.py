@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side caches of WebDAV metadata
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _normalize_path(path):
+    return (path or '').strip('/')
+
+
+def _is_in_tree(path, root):
+    return not root or path == root or path.startswith(root + '/')
+
+
+# pylint: disable=useless-object-inheritance
+class FileIdCache(object):
+    """
+    Bidirectional LRU cache of path <-> file id (and etag), thread-safe.
+
+    It is fed with every File parsed from a WebDAV response,
+    and invalidated when the client changes the files. Changes done by
+    other clients (path moved, or deleted and created again) are not seen :
+    an entry is used during ttl seconds only.
+
+    :param max_entries: max number of paths kept (0 disables the cache)
+    :param ttl:         seconds during which an entry is used (None: no expiry)
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._by_path = OrderedDict()  # path: (file_id, etag, timestamp)
+        self._by_id = {}               # file_id: path
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._by_path)
+
+    def _pop(self, path):
+        file_id = self._by_path.pop(path)[0]
+        if self._by_id.get(file_id) == path:
+            del self._by_id[file_id]
+
+    def put(self, path, file_id, etag=None):
+        """
+        Remember the file id (and etag) of a path
+
+        :param path: path relative to user root
+        :param file_id: file id
+        :param etag: etag (None if unknown)
+        """
+        if not self.max_entries or file_id is None:
+            return
+        path = _normalize_path(path)
+        with self._lock:
+            if path in self._by_path:
+                self._pop(path)
+            old_path = self._by_id.get(file_id)
+            if old_path is not None and old_path != path:
+                # file was moved
+                self._by_path.pop(old_path, None)
+            self._by_path[path] = (file_id, etag, time.time())
+            self._by_id[file_id] = path
+            while len(self._by_path) > self.max_entries:
+                self._pop(next(iter(self._by_path)))
+
+    def _get(self, path):
+        path = _normalize_path(path)
+        with self._lock:
+            entry = self._by_path.get(path)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                self._pop(path)
+                return None
+            self._by_path[path] = self._by_path.pop(path)
+            return entry
+
+    def _is_expired(self, entry):
+        return self.ttl is not None and time.time() - entry[2] > self.ttl
+
+    def get_file_id(self, path):
+        """ Get the file id of a path, None if unknown """
+        entry = self._get(path)
+        return entry[0] if entry else None
+
+    def get_etag(self, path):
+        """ Get the etag of a path, None if unknown """
+        entry = self._get(path)
+        return entry[1] if entry else None
+
+    def get_path(self, file_id):
+        """ Get the path of a file id, None if unknown """
+        with self._lock:
+            path = self._by_id.get(file_id)
+            if path is not None and self._is_expired(self._by_path[path]):
+                self._pop(path)
+                return None
+            return path
+
+    def invalidate(self, path):
+        """
+        Forget a path and all the paths under it,
+        and the etags of its parent folders (their content changed)
+
+        :param path: path relative to user root ('' for every path)
+        """
+        path = _normalize_path(path)
+        with self._lock:
+            for cached_path in list(self._by_path):
+                if _is_in_tree(cached_path, path):
+                    self._pop(cached_path)
+                elif _is_in_tree(path, cached_path):
+                    file_id, _etag, timestamp = self._by_path[cached_path]
+                    self._by_path[cached_path] = (file_id, None, timestamp)
+
+    def clear(self):
+        """ Forget everything """
+        with self._lock:
+            self._by_path.clear()
+            self._by_id.clear()
+
+
+# pylint: disable=useless-object-inheritance, too-many-instance-attributes
+class MetadataCache(object):
+    """
+    LRU cache of WebDAV listings (PROPFIND responses and parsed files), thread-safe.
+
+    A listing younger than ttl is used as is. An older one is revalidated
+    with a PROPFIND fetching only the etag of the path : it is used again
+    if the etag did not change.
+
+    :param ttl:         seconds during which a listing is used without request
+    :param max_entries: max number of listings kept
+    :param max_bytes:   max size of the kept listings (raw responses)
+    :param revalidate:  revalidate outdated listings with their etag
+                        (if False, outdated listings are fetched again)
+    """
+
+    def __init__(self, ttl=60, max_entries=1000, max_bytes=10 * 1024 * 1024,
+                 revalidate=True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        self._entries = OrderedDict()  # key: [timestamp, etag, raw response, size, items]
+        self._bytes = 0
+        self._counters = dict.fromkeys(
+            ['hits', 'misses', 'revalidations', 'evictions'], 0)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        """
+        Counters of the cache usage : hits, misses, revalidations
+        (hits after an etag check), evictions, entries and bytes
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(entries=len(self._entries), bytes=self._bytes)
+            return stats
+
+    def count(self, counter):
+        """ Increment a usage counter (see stats) """
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def get(self, key):
+        """
+        Get a listing
+
+        :param key: (path, ...) tuple
+        :returns: (is_fresh, etag, raw response, parsed items) or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = self._entries.pop(key)
+            return (time.time() - entry[0] <= self.ttl, entry[1], entry[2], entry[4])
+
+    def touch(self, key):
+        """ Mark a listing as fresh (e.g. its etag did not change) """
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][0] = time.time()
+
+    def set(self, key, etag, raw, size, items=None):
+        """
+        Keep a listing
+
+        :param key: (path, ...) tuple
+        :param etag: etag of the path (None if unknown)
+        :param raw: raw response
+        :param size: size of the response
+        :param items: objects parsed from the response (e.g. File list)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if size > self.max_bytes or not self.max_entries:
+                return
+            self._entries[key] = [time.time(), etag, raw, size, items]
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self, path):
+        """
+        Forget the listings of a path, of the paths under it,
+        and of its parent folders (their content changed)
+
+        :param path: path relative to user root ('' for every path)
+        """
+        path = _normalize_path(path)
+        with self._lock:
+            for key in list(self._entries):
+                if _is_in_tree(key[0], path) or _is_in_tree(path, key[0]):
+                    self._pop(key)
+
+    def clear(self):
+        """ Forget everything """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# pylint: disable=useless-object-inheritance
+class ContentCache(object):
+    """
+    On-disk LRU cache of file contents, keyed by file url and etag,
+    thread-safe (but not meant to be used by several processes at once).
+
+    :param path:      directory where the contents are saved
+    :param max_bytes: max size of the saved contents
+    """
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, path, max_bytes=100 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self._entries = None  # key: (etag, file name, size), in LRU order
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(os.path.join(self.path, self.INDEX_FILE)) as index_file:
+                for key, etag, file_name, size in json.load(index_file):
+                    if os.path.isfile(os.path.join(self.path, file_name)):
+                        self._entries[key] = (etag, file_name, size)
+                        self._bytes += size
+        except (IOError, OSError, ValueError, TypeError):
+            pass
+
+    def _save(self):
+        index_path = os.path.join(self.path, self.INDEX_FILE)
+        try:
+            with open(index_path + '.tmp', 'w') as index_file:
+                json.dump([[key] + list(entry) for key, entry in self._entries.items()],
+                          index_file)
+            os.rename(index_path + '.tmp', index_path)
+        except (IOError, OSError) as error:
+            _LOGGER.warning('Failed to save content cache index in %s: %s', self.path, error)
+
+    def _pop(self, key):
+        _etag, file_name, size = self._entries.pop(key)
+        self._bytes -= size
+        try:
+            os.remove(os.path.join(self.path, file_name))
+        except OSError:
+            pass
+
+    def get_etag(self, key):
+        """ Get the etag of the saved content of key (file url), None if unknown """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def read(self, key, etag):
+        """
+        Read the saved content of key (file url)
+
+        :param key: file url
+        :param etag: expected etag
+        :returns: content (bytes) or None if not saved with this etag
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            try:
+                with open(os.path.join(self.path, entry[1]), 'rb') as content_file:
+                    content = content_file.read()
+            except (IOError, OSError):
+                self._pop(key)
+                return None
+            self._entries[key] = self._entries.pop(key)
+            return content
+
+    def set(self, key, etag, content):
+        """
+        Save the content of key (file url)
+
+        :param key: file url
+        :param etag: etag of the content
+        :param content: bytes
+        """
+        with self._lock:
+            self._load()
+            existed = key in self._entries
+            if existed:
+                self._pop(key)
+            if not etag or len(content) > self.max_bytes:
+                if existed:
+                    self._save()
+                return
+            file_name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            try:
+                if not os.path.isdir(self.path):
+                    os.makedirs(self.path)
+                file_path = os.path.join(self.path, file_name)
+                with open(file_path + '.tmp', 'wb') as content_file:
+                    content_file.write(content)
+                os.rename(file_path + '.tmp', file_path)
+            except (IOError, OSError) as error:
+                _LOGGER.warning('Failed to save content in %s: %s', self.path, error)
+                return
+            self._entries[key] = (etag, file_name, len(content))
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+            self._save()
+
+    def invalidate(self, key):
+        """
+        Forget the content of key (file url) and of the urls under it
+
+        :param key: file url
+        """
+        key = _normalize_path(key)
+        with self._lock:
+            self._load()
+            removed = False
+            for cached_key in list(self._entries):
+                if _is_in_tree(_normalize_path(cached_key), key):
+                    self._pop(cached_key)
+                    removed = True
+            if removed:
+                self._save()
+
+    def clear(self):
+        """ Forget everything """
+        with self._lock:
+            self._load()
+            for key in list(self._entries):
+                self._pop(key)
+            self._save()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Tools for running requests concurrently
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ..exceptions import NextCloudDependencyError
+
+DEFAULT_MAX_WORKERS = 8
+
+
+# pylint: disable=useless-object-inheritance
+class RateLimiter(object):
+    """
+    Token bucket that limits the number of calls per second (thread-safe).
+
+    :param rate:  number of calls allowed per second
+    :param burst: number of calls that can be done at once (default 1)
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('rate shall be a positive number')
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """ Wait until a call is allowed """
+        while True:
+            with self._lock:
+                self._refill(time.time())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def get_rate_limiter(rate_limit):
+    """
+    Get a RateLimiter from a rate limit value
+
+    :param rate_limit: None, number of calls per second or RateLimiter
+    :returns: RateLimiter or None
+    """
+    if rate_limit is None or isinstance(rate_limit, RateLimiter):
+        return rate_limit
+    return RateLimiter(rate_limit)
+
+
+def iter_concurrently(func, args_list, max_workers=None, rate_limit=None):
+    """
+    Apply func on every element of args_list using a pool of threads.
+
+    Results are yielded as soon as they are available (not in the order of args_list).
+    Only a bounded number of calls are pending at once, so args_list can be
+    a (long) generator.
+
+    :param func:        function taking one argument
+    :param args_list:   iterable of arguments
+    :param max_workers: number of threads (default DEFAULT_MAX_WORKERS)
+    :param rate_limit:  max number of calls per second (number or RateLimiter)
+    :returns: iterator of (arg, result, error) tuples, error being
+              the exception raised by func (or None)
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    rate_limiter = get_rate_limiter(rate_limit)
+
+    def _call(arg):
+        if rate_limiter:
+            rate_limiter.acquire()
+        return func(arg)
+
+    args_iter = iter(args_list)
+    pending = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            for arg in args_iter:
+                pending[executor.submit(_call, arg)] = arg
+                if len(pending) >= max_workers * 2:
+                    break
+            if not pending:
+                return
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                arg = pending.pop(future)
+                error = future.exception()
+                yield (arg, None if error else future.result(), error)
+    finally:
+        # if the iteration is stopped, don't wait for remaining calls
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=not pending)
+
+
+def run_tasks(tasks, max_workers=None, rate_limit=None):
+    """
+    Run tasks using a pool of threads, a task being started only when
+    all the tasks it depends on are successfully done.
+
+    If a task fails (raise an exception), the tasks depending on it are not run
+    and get a NextCloudDependencyError.
+
+    :param tasks:       iterable of (key, func, deps) tuples, with
+                        key   : hashable identifier of the task
+                        func  : function without argument
+                        deps  : list of keys of required tasks
+                                (keys of unknown tasks are ignored)
+    :param max_workers: number of threads (default DEFAULT_MAX_WORKERS)
+    :param rate_limit:  max number of calls per second (number or RateLimiter)
+    :returns: iterator of (key, result, error) tuples, in completion order
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    rate_limiter = get_rate_limiter(rate_limit)
+
+    def _call(func):
+        if rate_limiter:
+            rate_limiter.acquire()
+        return func()
+
+    waiting = OrderedDict((key, (func, deps)) for key, func, deps in tasks)
+    waiting = OrderedDict(
+        (key, (func, [dep for dep in (deps or []) if dep in waiting]))
+        for key, (func, deps) in waiting.items()
+    )
+    succeeded = {}
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or pending:
+            changed = True
+            while changed:
+                changed = False
+                for key in list(waiting):
+                    func, deps = waiting[key]
+                    failed = [dep for dep in deps if succeeded.get(dep) is False]
+                    if failed:
+                        del waiting[key]
+                        succeeded[key] = False
+                        changed = True
+                        yield (key, None, NextCloudDependencyError(
+                            'Required operation failed', key, failed))
+                    elif all(succeeded.get(dep) for dep in deps):
+                        del waiting[key]
+                        pending[executor.submit(_call, func)] = key
+            if not pending:
+                if waiting:
+                    raise ValueError('Circular dependencies between tasks: %s'
+                                     % list(waiting))
+                break
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                error = future.exception()
+                succeeded[key] = error is None
+                yield (key, None if error else future.result(), error)
+
+
+# pylint: disable=useless-object-inheritance
+class Submitter(object):
+    """
+    Futures-returning variant of the client methods::
+
+      >>> future = nxc.submit.set_quota_of_group_folder(fid, 1024)
+      >>> future.result().is_ok
+
+    Calls are run by a (shared) executor, limiting the number
+    of concurrent requests.
+
+    :param client:      NextCloud client
+    :param executor:    concurrent.futures.Executor
+                        (default: thread pool of max_workers threads)
+    :param max_workers: number of threads of the default executor
+                        (default DEFAULT_MAX_WORKERS)
+    """
+
+    def __init__(self, client, executor=None, max_workers=None):
+        self._client = client
+        self._executor = executor
+        self._max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """ Executor running the calls (created at first use) """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+            return self._executor
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self._client, name)
+        if not callable(method):
+            raise AttributeError('%s is not a method of the client' % name)
+
+        def _submit(*args, **kwargs):
+            return self.executor.submit(method, *args, **kwargs)
+
+        _submit.__name__ = name
+        _submit.__doc__ = getattr(method, '__doc__', None)
+        return _submit
+
+    def __dir__(self):
+        return [name for name in dir(self._client)
+                if not name.startswith('_') and callable(getattr(self._client, name))]
+
+    def shutdown(self, wait_calls=True):
+        """
+        Release the executor (a new one is created at next call)
+
+        :param wait_calls: wait for the pending calls to be done
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait_calls)
+
+
+# pylint: disable=useless-object-inheritance, too-many-instance-attributes
+class AdaptiveLimiter(object):
+    """
+    Concurrency limit adapted to the server throughput (AIMD), thread-safe.
+
+    The limit grows by one every limit successful requests (additive increase)
+    and is multiplied by backoff_ratio when the server is overloaded
+    (multiplicative decrease) : 429, 502, 503 or 504 responses, connection
+    errors, or latency (smoothed) above latency_tolerance times the lowest
+    latency observed in the last window requests.
+
+    Latencies are times to the response headers (see release) : the transfer
+    of large responses is not seen as an overload. Requests uploading large
+    bodies are not compared (no latency given by Session).
+
+    :param initial_limit:     concurrent requests allowed at start
+    :param min_limit:         min concurrent requests
+    :param max_limit:         max concurrent requests
+    :param backoff_ratio:     ratio applied to the limit on overload
+    :param latency_tolerance: latency ratio seen as an overload (None to ignore latencies)
+    :param window:            number of requests of the latency reference
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, initial_limit=DEFAULT_MAX_WORKERS, min_limit=1, max_limit=64,
+                 backoff_ratio=0.5, latency_tolerance=2.0, window=100):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.window = window
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._last_decrease = 0.
+        self._latency = None      # smoothed latency
+        self._min_latency = None  # lowest latency of the current window
+        self._ref_latency = None  # lowest latency of the previous window
+        self._samples = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """ Current number of concurrent requests allowed """
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """ Current number of concurrent requests """
+        return self._in_flight
+
+    def acquire(self):
+        """
+        Wait until a request is allowed
+
+        :returns: start time of the request (to give to release)
+        """
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        return time.time()
+
+    def _is_slow(self, latency):
+        if self.latency_tolerance is None:
+            return False
+        self._latency = latency if self._latency is None else (
+            0.9 * self._latency + 0.1 * latency)
+        self._min_latency = latency if self._min_latency is None else min(
+            self._min_latency, latency)
+        self._samples += 1
+        if self._samples >= self.window:
+            self._ref_latency, self._min_latency, self._samples = (
+                self._min_latency, None, 0)
+        if self._ref_latency is None and self._samples < 10:
+            # not enough latencies to compare
+            return False
+        reference = min(latency for latency in (self._ref_latency, self._min_latency)
+                        if latency is not None)
+        return self._latency > reference * self.latency_tolerance
+
+    def release(self, start, overloaded=False, latency=None):
+        """
+        Mark a request as done
+
+        :param start: value returned by acquire
+        :param overloaded: True if the server was overloaded (e.g. 503)
+        :param latency: seconds until the response headers were received
+                        (None if not measured : not compared)
+        """
+        now = time.time()
+        with self._cond:
+            self._in_flight -= 1
+            if latency is not None and self._is_slow(latency):
+                overloaded = True
+            if overloaded:
+                # only one decrease for the requests started before the last one
+                if start > self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self.max_limit, self._limit + 1. / self._limit)
+            self._cond.notify_all()
+
+
+# pylint: disable=useless-object-inheritance
+class RequestLimiter(object):
+    """
+    Limit the requests sent to the server : rate (token bucket)
+    and concurrency (fixed or adaptive), thread-safe.
+
+    :param rate:        max number of requests per second (None for no limit)
+    :param burst:       number of requests that can be sent at once (see RateLimiter)
+    :param concurrency: max number of concurrent requests (int),
+                        AdaptiveLimiter, or None for no limit
+    """
+    OVERLOAD_CODES = (429, 502, 503, 504)
+
+    def __init__(self, rate=None, burst=1, concurrency=None):
+        self.rate_limiter = RateLimiter(rate, burst) if rate else None
+        if isinstance(concurrency, int):
+            concurrency = AdaptiveLimiter(
+                initial_limit=concurrency, min_limit=concurrency, max_limit=concurrency)
+        self.concurrency = concurrency
+
+    def acquire(self):
+        """
+        Wait until a request is allowed
+
+        :returns: token to give to release
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return self.concurrency.acquire() if self.concurrency else None
+
+    def release(self, token, status_code=None, latency=None):
+        """
+        Mark a request as done
+
+        :param token: value returned by acquire
+        :param status_code: HTTP code of the response (None if it failed)
+        :param latency: seconds until the response headers were received
+                        (None if not measured, see AdaptiveLimiter)
+        """
+        if self.concurrency:
+            self.concurrency.release(
+                token, overloaded=status_code is None or status_code in self.OVERLOAD_CODES,
+                latency=latency)
@@ -2,7 +2,9 @@
 """
 XML parser
 """
+import io
 import xml.etree.ElementTree as ET
+import six
 from ..compat import encode_string
 
 
@@ -20,6 +22,29 @@ def fromstring(data):
     return ET.fromstring(_prepare_xml_parsing(data))
 
 
+def iter_responses(source):
+    """
+    Parse a multistatus xml incrementally, yielding each DAV:response element.
+    Elements are cleared after use, so that a big multistatus can be read
+    in bounded memory.
+
+    :param source: raw xml data (bytes) or file-like object
+    :returns:      iterator of :class:xml.etree.ElementTree.Element
+    """
+    if not hasattr(source, 'read'):
+        if isinstance(source, six.text_type):
+            source = source.encode('utf-8')
+        source = io.BytesIO(source)
+    context = ET.iterparse(source, events=('start', 'end'))
+    root = None
+    for event, element in context:
+        if root is None:
+            root = element
+        elif event == 'end' and element.tag == '{DAV:}response':
+            yield element
+            root.remove(element)
+
+
 # Note : etree_to_dict is mainly developped for group_folders wrapper v4 which
 #        doesn't support json format
 
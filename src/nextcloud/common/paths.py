@@ -13,6 +13,14 @@ def split_path(fpath):
     f_name, dir_name = (f_path.pop(), '/'.join(f_path))
     return (dir_name, f_name)
 
+def parent_paths(fpath):
+    '''
+    Return the parent folders of a path, nearest first
+    e.g. 'foo/bar/A' -> ['foo/bar', 'foo']
+    '''
+    f_path = fpath.strip('/').split('/')[:-1]
+    return ['/'.join(f_path[:idx]) for idx in range(len(f_path), 0, -1)]
+
 def sequenced_paths_list(folder_paths, exclude=None):
     '''
     Return the list of paths to minimize the number of operations while not missing a thing
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Retry policy of the requests (backoff, Retry-After, retry budgets)
+"""
+import email.utils
+import random
+import threading
+import time
+
+import requests
+import six
+from requests.packages.urllib3.exceptions import (  # pylint: disable=import-error
+    NewConnectionError, ConnectTimeoutError
+)
+from six.moves.urllib.parse import urlparse
+
+from .streams import is_buffer
+
+TOO_MANY_REQUESTS = 429
+SERVICE_UNAVAILABLE = 503
+
+IDEMPOTENT_METHODS = frozenset([
+    'GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE',
+    'PROPFIND', 'PROPPATCH', 'REPORT', 'SEARCH',
+])
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header
+
+    :param value: number of seconds or HTTP date
+    :returns: number of seconds to wait, None if the value is invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0., email.utils.mktime_tz(date) - time.time())
+
+
+def is_not_sent(error):
+    """ Say if a requests exception happened before the request was sent """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0] if error.args else None, 'reason', None)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def get_endpoint(url, depth=3):
+    """
+    Get the endpoint of an url : server and first path segments
+    (e.g. 'cloud.host/remote.php/dav/files', 'cloud.host/ocs/v2.php/apps')
+    """
+    parsed = urlparse(url)
+    segments = [segment for segment in parsed.path.split('/') if segment]
+    return '/'.join([parsed.netloc] + segments[:depth])
+
+
+# pylint: disable=useless-object-inheritance
+class RetryBudget(object):
+    """
+    Limit the retries to a ratio of the requests, so that retries
+    can't multiply the load of an unhealthy server (thread-safe).
+
+    Each request deposits ratio token, each retry withdraws one.
+
+    :param ratio:       retries allowed per request
+    :param min_retries: retries allowed in a row (max number of tokens)
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self._tokens = float(min_retries)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """ Count a request """
+        with self._lock:
+            self._tokens = min(self.min_retries, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """
+        Count a retry
+
+        :returns: False if the budget is exhausted (no retry shall be done)
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+# pylint: disable=useless-object-inheritance, too-many-instance-attributes
+class RetryPolicy(object):
+    """
+    Decide if and when a failed request is retried.
+
+    - delays grow exponentially with full jitter (random between 0 and
+      backoff_factor * 2 ** attempt, at most max_backoff)
+    - the Retry-After header of 429 and 503 responses is respected
+    - a 429 (too many requests, or Nextcloud brute force protection) without
+      Retry-After waits at least throttle_delay
+    - requests that may have been processed are retried only if their
+      method is idempotent ; 429 and 503 responses and connection failures
+      (request not sent) are retried whatever the method
+    - retries are limited per endpoint (see RetryBudget)
+
+    :param total:            max number of retries of a request (0 disables retries)
+    :param backoff_factor:   base delay in seconds
+    :param max_backoff:      max delay in seconds (Retry-After included)
+    :param status_forcelist: HTTP codes to retry
+    :param methods:          idempotent methods (retried on any failure)
+    :param throttle_delay:   min delay after a 429 without Retry-After
+    :param budget_ratio:     retries allowed per request of an endpoint
+                             (None disables the budgets)
+    :param budget_min:       retries allowed per endpoint whatever the requests
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=60,
+                 status_forcelist=(TOO_MANY_REQUESTS, 502, SERVICE_UNAVAILABLE, 504),
+                 methods=IDEMPOTENT_METHODS, throttle_delay=30,
+                 budget_ratio=0.2, budget_min=10):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = frozenset(status_forcelist)
+        self.methods = frozenset(method.upper() for method in methods)
+        self.throttle_delay = throttle_delay
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def get_budget(self, url):
+        """ Get the RetryBudget of the endpoint of url (None if no budget) """
+        if self.budget_ratio is None:
+            return None
+        endpoint = get_endpoint(url)
+        with self._lock:
+            if endpoint not in self._budgets:
+                self._budgets[endpoint] = RetryBudget(self.budget_ratio, self.budget_min)
+            return self._budgets[endpoint]
+
+    def get_backoff(self, attempt):
+        """ Get a random delay before the retry number attempt (from 0) """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def get_retry_after(self, response):
+        """ Get the delay requested by a 429 or 503 response (None if none) """
+        if response.status_code not in (TOO_MANY_REQUESTS, SERVICE_UNAVAILABLE):
+            return None
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None and response.status_code == TOO_MANY_REQUESTS:
+            delay = self.throttle_delay
+        return delay
+
+    def _is_retriable(self, method, response, error):
+        if error is not None:
+            if is_not_sent(error):
+                return True
+            # the request may have been processed
+            return (isinstance(error, (requests.exceptions.ConnectionError,
+                                       requests.exceptions.Timeout))
+                    and method in self.methods)
+        if response.status_code not in self.status_forcelist:
+            return False
+        return (method in self.methods or
+                response.status_code in (TOO_MANY_REQUESTS, SERVICE_UNAVAILABLE))
+
+    def get_delay(self, method, url, attempt, response=None, error=None):
+        """
+        Get the delay before retrying a request
+
+        :param method: HTTP method
+        :param url: url of the request
+        :param attempt: number of retries already done
+        :param response: requests.Response (if any)
+        :param error: requests.RequestException (if no response)
+        :returns: delay in seconds, None if the request shall not be retried
+        """
+        method = method.upper()
+        if attempt >= self.total or not self._is_retriable(method, response, error):
+            return None
+        budget = self.get_budget(url)
+        if budget is not None and not budget.withdraw():
+            return None
+        delay = self.get_backoff(attempt)
+        if response is not None:
+            delay = max(delay, self.get_retry_after(response) or 0)
+        return min(delay, self.max_backoff)
+
+    def on_request(self, url):
+        """ Count a (first) request for the budget of its endpoint """
+        budget = self.get_budget(url)
+        if budget is not None:
+            budget.deposit()
+
+    @staticmethod
+    def can_resend(data):
+        """ Say if a request body can be sent again (not a consumed stream) """
+        if data is None or isinstance(data, (bytes, six.text_type, dict, list, tuple)) or is_buffer(data):
+            return True
+        return hasattr(data, 'seek') and hasattr(data, 'tell')
+
+    @staticmethod
+    def sleep(delay):
+        """ Wait before a retry """
+        time.sleep(delay)
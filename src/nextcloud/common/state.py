@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Stores of the client state (cookies, capabilities, app passwords),
+shared between processes
+"""
+import abc
+import contextlib
+import json
+import logging
+import os
+import threading
+
+import six
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+try:
+    import dbm
+except ImportError:  # python 2
+    import anydbm as dbm  # pylint: disable=import-error
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _makedirs(directory):
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+
+
+@contextlib.contextmanager
+def _file_lock(path, shared=False):
+    """ Lock path + '.lock' (between processes, if fcntl is available) """
+    if fcntl is None:
+        yield
+        return
+    _makedirs(os.path.dirname(path))
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+# pylint: disable=useless-object-inheritance
+@six.add_metaclass(abc.ABCMeta)
+class StateStore(object):
+    """
+    Key-value store of JSON-serializable values
+    """
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        """ Get the value of key (default if unknown) """
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """ Save the value of key """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """ Forget the value of key """
+
+
+class MemoryStateStore(StateStore):
+    """ Store in memory (shared by the clients of a process only) """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class FileStateStore(StateStore):
+    """
+    Store in a JSON file only readable by its owner, locked while it
+    is changed so that several processes can use it.
+
+    :param path: file where the values are saved
+    """
+
+    def __init__(self, path='~/.cache/nextcloud/state.json'):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as state_file:
+                return json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _update(self, func):
+        with self._lock:
+            try:
+                with _file_lock(self.path):
+                    _makedirs(os.path.dirname(self.path))
+                    values = self._load()
+                    func(values)
+                    tmp_path = '%s.%s.tmp' % (self.path, os.getpid())
+                    file_desc = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(file_desc, 'w') as state_file:
+                        json.dump(values, state_file)
+                    os.rename(tmp_path, self.path)
+            except (IOError, OSError) as error:
+                _LOGGER.warning('Failed to save state in %s: %s', self.path, error)
+
+    def get(self, key, default=None):
+        return self._load().get(key, default)
+
+    def set(self, key, value):
+        self._update(lambda values: values.__setitem__(key, value))
+
+    def delete(self, key):
+        self._update(lambda values: values.pop(key, None))
+
+
+class DbmStateStore(StateStore):
+    """
+    Store in a dbm database (see dbm module), values being saved as JSON,
+    locked while it is opened so that several processes can use it
+    (with fcntl only : on Windows, it shall be used by one process only).
+
+    :param path: database file
+    """
+
+    def __init__(self, path='~/.cache/nextcloud/state.db'):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def _open(self, flag):
+        if flag == 'c':
+            _makedirs(os.path.dirname(self.path))
+        return dbm.open(self.path, flag, 0o600)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                with _file_lock(self.path, shared=True):
+                    database = self._open('r')
+                    try:
+                        value = database.get(key.encode('utf-8'))
+                    finally:
+                        database.close()
+            except (dbm.error, IOError, OSError):
+                return default
+        return default if value is None else json.loads(value.decode('utf-8'))
+
+    def set(self, key, value):
+        with self._lock:
+            try:
+                with _file_lock(self.path):
+                    database = self._open('c')
+                    try:
+                        database[key.encode('utf-8')] = json.dumps(value).encode('utf-8')
+                    finally:
+                        database.close()
+            except (dbm.error, IOError, OSError) as error:
+                _LOGGER.warning('Failed to save state in %s: %s', self.path, error)
+
+    def delete(self, key):
+        with self._lock:
+            try:
+                with _file_lock(self.path):
+                    database = self._open('w')
+                    try:
+                        if key.encode('utf-8') in database:
+                            del database[key.encode('utf-8')]
+                    finally:
+                        database.close()
+            except (dbm.error, IOError, OSError):
+                return
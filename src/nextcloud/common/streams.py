@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Tools for streaming request bodies
+"""
+import hashlib
+import mmap
+import os
+import six
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_buffer(contents):
+    """ Say if contents implements the buffer protocol (bytearray, memoryview, mmap…) """
+    if isinstance(contents, mmap.mmap):
+        return True
+    if isinstance(contents, (bytes, six.text_type)) or hasattr(contents, 'read'):
+        return False
+    try:
+        memoryview(contents)
+    except TypeError:
+        return False
+    return True
+
+
+def is_file(contents):
+    """ Say if contents is a file-like object """
+    return hasattr(contents, 'read') and not isinstance(contents, mmap.mmap)
+
+
+def get_body(contents):
+    """
+    Get a request body streaming contents without copying them
+
+    :param contents: bytes, buffer (bytearray, memoryview, mmap…),
+                     file-like object or iterable of bytes
+    :returns: bytes, memoryview of bytes, file-like object or iterator
+              (sent with Content-Length if the size is known, with chunked
+              transfer-encoding otherwise)
+    """
+    if contents is None or isinstance(contents, bytes) or is_file(contents):
+        return contents
+    if is_buffer(contents):
+        view = memoryview(contents)
+        # one item per byte, so that len() is the size
+        return view.cast('B') if six.PY3 and view.format != 'B' else view
+    return iter(contents)
+
+
+def get_size(contents):
+    """
+    Get the size of contents
+
+    :param contents: see get_body
+    :returns: number of bytes (from the current position for a file)
+              or None if unknown
+    """
+    if isinstance(contents, bytes):
+        return len(contents)
+    if is_buffer(contents):
+        return memoryview(contents).nbytes if six.PY3 else len(memoryview(contents))
+    if is_file(contents):
+        try:
+            size = os.fstat(contents.fileno()).st_size
+            return size - contents.tell() if size else None
+        except (AttributeError, OSError, IOError, ValueError):
+            pass
+        try:
+            position = contents.tell()
+            contents.seek(0, os.SEEK_END)
+            size = contents.tell() - position
+            contents.seek(position)
+            return size
+        except (AttributeError, OSError, IOError, ValueError):
+            pass
+    return None
+
+
+def get_sha1(contents):
+    """
+    Compute the SHA1 checksum of contents,
+    without consuming them (a file is read, then rewound)
+
+    :param contents: see get_body
+    :returns: hex digest
+    :raises: ValueError if contents can't be read twice (iterator, pipe…)
+    """
+    if isinstance(contents, bytes) or is_buffer(contents):
+        return hashlib.sha1(contents).hexdigest()
+    if is_file(contents):
+        sha1 = hashlib.sha1()
+        try:
+            position = contents.tell()
+            for chunk in iter(lambda: contents.read(CHUNK_SIZE), b''):
+                sha1.update(chunk)
+            contents.seek(position)
+            return sha1.hexdigest()
+        except (AttributeError, OSError, IOError) as error:
+            raise ValueError('Contents are not seekable: %s' % error)
+    raise ValueError('Checksum of an iterator cannot be computed without consuming it')
+
+
+# pylint: disable=useless-object-inheritance
+class CountingReader(object):
+    """
+    File-like object counting the bytes read from another one
+
+    :param fileobj: file-like object
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.count = 0
+
+    def read(self, size=-1):
+        """ Read and count """
+        data = self.fileobj.read(size) if size is not None and size >= 0 else self.fileobj.read()
+        self.count += len(data)
+        return data
@@ -20,4 +20,5 @@ class NextCloudLoginError(NextCloudError):
     """ A login error occurred """
 
 
-
+class NextCloudDependencyError(NextCloudError):
+    """ An operation was not done because an operation it depends on failed """
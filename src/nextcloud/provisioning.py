@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative provisioning of users, groups and memberships.
+
+The plan is a desired state. It is compared to the current state of the server
+and only the missing operations are done (concurrently, groups and users being
+created before memberships).
+
+Example :
+>>> from nextcloud import provisioning
+>>> plan = {
+>>>     'groups': ['staff'],
+>>>     'users': {
+>>>         'jdoe': {
+>>>             'password': 'secret',  # only used at user creation
+>>>             'displayname': 'John Doe',
+>>>             'email': 'jdoe@example.org',
+>>>             'quota': 1073741824,   # bytes, to be comparable with current quota
+>>>             'groups': ['staff', 'devs'],
+>>>             'subadmin': ['devs'],
+>>>         },
+>>>     },
+>>> }
+>>> for operation in provisioning.apply(nxc, plan, dry_run=True):
+>>>     print(operation)
+<Operation add_group('devs'): planned>
+…
+"""
+import functools
+from .common import parallel
+from .exceptions import NextCloudError
+
+USER_FIELDS = ['email', 'quota', 'phone', 'address', 'website', 'twitter', 'displayname']
+USER_KEYS = USER_FIELDS + ['password', 'groups', 'subadmin']
+DEFAULT_PAGE_SIZE = 500
+
+
+# pylint: disable=useless-object-inheritance
+class Operation(object):
+    """
+    A provisioning operation, i.e. a call of a NextCloud client method
+
+    Attributes:
+    - method   : name of the client method
+    - args     : arguments of the call
+    - key      : identifier of the operation (without secret values)
+    - deps     : keys of the operations that shall succeed before this one
+    - done     : True if the operation was run
+    - response : requester response
+    - error    : NextCloudError if the operation failed
+    """
+
+    def __init__(self, method, args, key=None, deps=None):
+        self.method = method
+        self.args = args
+        self.key = key or (method,) + tuple(args)
+        self.deps = deps or []
+        self.done = False
+        self.response = None
+        self.error = None
+
+    @property
+    def is_ok(self):
+        """ True if the operation was successfully done """
+        return self.done and self.error is None
+
+    def run(self, client):
+        """ Apply the operation with the client """
+        self.response = getattr(client, self.method)(*self.args)
+        if not self.response.is_ok:
+            raise NextCloudError(self.response.get_error_message(),
+                                 self.method, self.response)
+        return self.response
+
+    def __repr__(self):
+        status = 'planned'
+        if self.done:
+            status = 'OK' if self.is_ok else 'Failed'
+        return "<Operation %s(%s): %s>" % (
+            self.method, ', '.join(repr(arg) for arg in self.key[1:]), status)
+
+
+def _iter_paged(list_func, data_key, page_size):
+    offset = 0
+    while True:
+        resp = list_func(limit=page_size, offset=offset)
+        if not resp.is_ok:
+            raise NextCloudError(resp.get_error_message(), data_key, resp)
+        page = resp.data[data_key] or []
+        for value in page:
+            yield value
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def _unique(values):
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
+
+
+def _current_value(user_data, field):
+    value = user_data.get(field)
+    if field == 'quota' and isinstance(value, dict):
+        value = value.get('quota')
+    return value
+
+
+def plan_operations(client, plan, prune=False, page_size=DEFAULT_PAGE_SIZE,
+                    max_workers=None, rate_limit=None):
+    """
+    Compare the plan to the current state of the server,
+    and return the operations needed to reach the plan.
+
+    :param client: NextCloud client
+    :param plan: dict with 'groups' (list of gid) and 'users' ({uid: user spec})
+    :param prune: remove users from groups (and subadmin rights)
+                  that are not listed in the user spec
+    :param page_size: number of users/groups fetched per listing request
+    :param max_workers: max number of simultaneous requests
+    :param rate_limit: optional max number of requests per second
+    :returns: list of Operation
+    """
+    users = plan.get('users', {})
+    for uid, spec in users.items():
+        unknown_keys = [k for k in spec if k not in USER_KEYS]
+        if unknown_keys:
+            raise ValueError("Unknown keys for user '%s': %s (choose from %s)"
+                             % (uid, unknown_keys, USER_KEYS))
+
+    current_groups = set(_iter_paged(client.get_groups, 'groups', page_size))
+    current_users = set(_iter_paged(client.get_users, 'users', page_size))
+    details = {}
+    for uid, data, error in client.get_users_details(
+            [uid for uid in users if uid in current_users],
+            max_workers=max_workers, rate_limit=rate_limit):
+        if error:
+            raise error
+        details[uid] = data
+
+    operations = []
+    wanted_groups = _unique(
+        list(plan.get('groups', [])) +
+        [gid for spec in users.values()
+         for gid in spec.get('groups', []) + spec.get('subadmin', [])]
+    )
+    for gid in wanted_groups:
+        if gid not in current_groups:
+            operations.append(Operation('add_group', (gid,)))
+
+    for uid, spec in users.items():
+        user_deps = []
+        user_data = details.get(uid)
+        if user_data is None:
+            operations.append(Operation('add_user', (uid, spec.get('password')),
+                                        key=('add_user', uid)))
+            user_deps = [('add_user', uid)]
+            user_data = {}
+        for field in USER_FIELDS:
+            if field not in spec:
+                continue
+            if user_data and str(_current_value(user_data, field)) == str(spec[field]):
+                continue
+            operations.append(Operation('edit_user', (uid, field, spec[field]),
+                                        deps=user_deps))
+
+        for spec_key, add_method, remove_method in [
+                ('groups', 'add_to_group', 'remove_from_group'),
+                ('subadmin', 'create_subadmin', 'remove_subadmin')]:
+            if spec_key not in spec:
+                continue
+            current = set(user_data.get(spec_key) or [])
+            for gid in spec[spec_key]:
+                if gid not in current:
+                    operations.append(Operation(
+                        add_method, (uid, gid),
+                        deps=user_deps + [('add_group', gid)]))
+            if prune:
+                for gid in sorted(current - set(spec[spec_key])):
+                    operations.append(Operation(remove_method, (uid, gid)))
+    return operations
+
+
+def apply(client, plan, dry_run=False, prune=False, page_size=DEFAULT_PAGE_SIZE,
+          max_workers=None, rate_limit=None):
+    """
+    Apply the plan (see plan_operations) :
+    operations are run concurrently, following their dependencies.
+
+    :param client: NextCloud client
+    :param plan: dict with 'groups' (list of gid) and 'users' ({uid: user spec})
+    :param dry_run: only return the operations that would be done
+    :param prune: remove users from groups (and subadmin rights)
+                  that are not listed in the user spec
+    :param page_size: number of users/groups fetched per listing request
+    :param max_workers: max number of simultaneous requests
+    :param rate_limit: optional max number of requests per second
+    :returns: list of Operation (check is_ok, response and error attributes)
+    """
+    operations = plan_operations(client, plan, prune=prune, page_size=page_size,
+                                 max_workers=max_workers, rate_limit=rate_limit)
+    if dry_run:
+        return operations
+
+    by_key = {operation.key: operation for operation in operations}
+    tasks = [(operation.key, functools.partial(operation.run, client), operation.deps)
+             for operation in operations]
+    for key, _resp, error in parallel.run_tasks(tasks, max_workers=max_workers,
+                                                 rate_limit=rate_limit):
+        by_key[key].done = True
+        by_key[key].error = error
+    return operations
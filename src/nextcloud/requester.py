@@ -77,13 +77,13 @@ class Requester(object):
         """ The success code (<int> or <dict method_name: int>)"""
         return self.wrapper.SUCCESS_CODE
 
-    def rtn(self, resp, raw_content=None):
+    def rtn(self, resp, raw_content=None, stream=False):
         """ Build the response from requests response (see response_type) """
         # print(resp)
         # print(resp.content)
         return self.response_type(
             response=resp, raw_content=raw_content,
-            success_code=self.success_code
+            success_code=self.success_code, stream=stream
         )
 
     def get_full_url(self, additional_url=""):
@@ -117,7 +117,7 @@ class Requester(object):
     # pylint: disable=too-many-arguments
 
     def request(self, method, url, headers=None, params=None,
-                data=None, raw_content=False):
+                data=None, raw_content=False, stream=False):
         """
         Apply the request using 'requests' lib
 
@@ -127,6 +127,7 @@ class Requester(object):
         :param params:         requests parameters
         :param data:           data to push with the request
         :param raw_content:    use requests.Response content instead of default one
+        :param stream:         don't load the content (see BaseResponse.get_stream)
 
         :returns: BaseResponse inherited (see response_type property)
         """
@@ -134,9 +135,10 @@ class Requester(object):
         if '/' in method:
             method = method.split('/')[0]
         url = self.get_full_url(url)
-        res = self.session.request(method, url, headers=headers,
-                                   params=params, data=data)
-        return self.rtn(res, raw_content=raw_content)
+        kwargs = {'stream': True} if stream else {}
+        res = self.session.request(method, url, wrapper_class=type(self.wrapper),
+                                   headers=headers, params=params, data=data, **kwargs)
+        return self.rtn(res, raw_content=raw_content, stream=stream)
 
     def get(self, url="", **kwargs):
         " get request "
@@ -217,9 +219,9 @@ class WebDAVRequester(Requester):
         " report request "
         return self.request('report', url, **kwargs)
 
-    def download(self, url="", params=None):
+    def download(self, url="", params=None, headers=None):
         " download request "
-        return self.request('get', url, params=params, raw_content=True)
+        return self.request('get', url, params=params, headers=headers, raw_content=True)
 
     def make_collection(self, url=""):
         " mkcol request (make dir) "
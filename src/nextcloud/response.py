@@ -8,6 +8,7 @@ except ImportError:
     JSONDecodeError = ValueError
 
 from .common import parse_xml as ParseXML
+from .common.streams import CountingReader
 
 
 # pylint: disable=useless-object-inheritance, too-many-instance-attributes
@@ -16,6 +17,7 @@ class BaseResponse(object):
     Base Response that take HTTP reponse and take the following attrs
     - raw         : the raw response
     - raw_content : if the value of response data shall be raw
+    - stream      : if the content is not loaded (see get_stream)
 
     Attributes are guessed at init
     - data        : the associated data / dictionnary-like data or binary
@@ -26,11 +28,15 @@ class BaseResponse(object):
     - raw_content_data: the data in raw.content (byte)
     - content_data: the data in raw.content as a unicode string
     - json_data   : the data in a json dict
+    - wire_bytes  : the number of bytes received (compressed)
+    - decoded_bytes : the number of bytes of the (decompressed) content
     """
 
-    def __init__(self, response, raw_content=None, success_code=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, response, raw_content=None, success_code=None, stream=False):
         self.raw = response
         self.raw_content = raw_content
+        self.stream = stream
         self.data = None
         self.is_ok = None
 
@@ -38,11 +44,16 @@ class BaseResponse(object):
         self._json_data = None
         self._content_data = None
         self._raw_content_data = None
+        self._stream_reader = None
 
         self.success_code = success_code
 
-        self._compute_data()
+        if not stream:
+            self._compute_data()
         self._compute_is_ok()
+        if stream and not self.is_ok:
+            # content is needed for the error message
+            self._compute_data()
 
     @property
     def json_data(self):
@@ -75,6 +86,42 @@ class BaseResponse(object):
             self._status_code = self.raw.status_code
         return int(self._status_code or -1)
 
+    @property
+    def content_encoding(self):
+        """ Return the compression of the response (None if not compressed) """
+        return self.raw.headers.get('Content-Encoding')
+
+    @property
+    def wire_bytes(self):
+        """ Return the number of bytes received for the content (None if unknown) """
+        try:
+            return self.raw.raw.tell()
+        except (AttributeError, IOError, ValueError):
+            return None
+
+    @property
+    def decoded_bytes(self):
+        """ Return the number of bytes of the (decompressed) content read so far """
+        if self._stream_reader is not None:
+            return self._stream_reader.count
+        if self.stream:
+            return 0
+        return len(self.raw.content)
+
+    def get_stream(self):
+        """
+        Return a file-like object reading the (decompressed) content
+        of a streamed response (see Requester.request stream parameter)
+        """
+        if self._stream_reader is None:
+            self.raw.raw.decode_content = True
+            self._stream_reader = CountingReader(self.raw.raw)
+        return self._stream_reader
+
+    def close(self):
+        """ Release the connection of a streamed response """
+        self.raw.close()
+
     def _compute_is_ok(self):
         """ Set is_ok true if status_code match success code """
         success_code = self.success_code
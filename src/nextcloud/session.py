@@ -3,8 +3,10 @@
 import logging
 import time
 import requests
+import six
 from .compat import encode_requests_password
 from .codes import ExternalApiCodes
+from .common.retry import RetryPolicy
 from .exceptions import (
     NextCloudConnectionError, NextCloudLoginError
 )
@@ -12,26 +14,55 @@ from .response import BaseResponse
 
 _LOGGER = logging.getLogger(__name__)
 
+try:
+    # gzip, deflate, and br / zstd if brotli / zstandard are installed
+    from urllib3.util.request import ACCEPT_ENCODING
+except ImportError:
+    ACCEPT_ENCODING = 'gzip,deflate'
 
-class CustomRetry(requests.packages.urllib3.util.retry.Retry):
 
-    def get_backoff_time(self):
-        return 20.0
-
-# pylint: disable=useless-object-inheritance
+# pylint: disable=useless-object-inheritance, too-many-instance-attributes
 class Session(object):
-    """ Session for requesting """
+    """
+    Session for requesting
+
+    Special keys of session_kwargs (the others are given to requests) :
+    - on_session_login : client method name (or function) checking the login
+    - accept_encoding  : compressions accepted for responses
+                         (default: all the ones supported, None to disable)
+    - retry_policy     : RetryPolicy of the requests (None to disable retries)
+    - limits           : dict of RequestLimiter by wrapper class, or class name
+                         (e.g. 'WebDAVApiWrapper', 'OCSv1ApiWrapper', 'GroupFolders'),
+                         'default' for the requests of other wrappers
+    - transport        : requests adapter sending the requests
+                         (e.g. HTTPXTransport for HTTP/2, see transport module)
+
+    The cookies of the persistent session (see login) can be saved in
+    a StateStore (state_store attribute), to be reused by other processes.
+    """
+    COOKIES_TTL = 3600  # max age of saved cookies (seconds)
+    # max size of the request bodies whose latency is given to the limiters
+    # (upload time is not a sign of overload)
+    LATENCY_MAX_BODY = 64 * 1024
 
     # pylint: disable=too-many-arguments
     def __init__(self, url=None, user=None, password=None, auth=None, session_kwargs=None):
         self.session = None
         self.auth = None
         self.user = None
+        self.app_password = None
+        self.state_store = None
+        self._account_auth = None
         self._set_credentials(user, password, auth)
         self.url = url.rstrip('/')
         self.login_url = self.url
-        session_kwargs = session_kwargs or {}
+        session_kwargs = dict(session_kwargs or {})
         self._login_check = session_kwargs.pop('on_session_login', False)
+        self.accept_encoding = session_kwargs.pop('accept_encoding', ACCEPT_ENCODING)
+        self.retry_policy = session_kwargs.pop('retry_policy', RetryPolicy())
+        self.limits = session_kwargs.pop('limits', None) or {}
+        self.transport = session_kwargs.pop('transport', None)
+        self._limiters = {}
         self._session_kwargs = session_kwargs
 
     def _set_credentials(self, user, password, auth):
@@ -48,12 +79,50 @@ class Session(object):
         if not self.auth and (self.user and password):
             self.auth = (self.user, encode_requests_password(password))
 
-    def request(self, method, url, **kwargs):
+    def use_app_password(self, app_password, user=None):
+        """
+        Authenticate with an app password instead of the account password
+
+        :param app_password: app password (None to use the account password again)
+        :param user: user id (default: current user)
+        """
+        if self.app_password is None:
+            self._account_auth = self.auth
+        if app_password is None:
+            self.auth = self._account_auth
+        else:
+            self.user = user or self.user
+            self.auth = (self.user, app_password)
+        self.app_password = app_password
+        if self.session:
+            self.session.auth = self.auth
+
+    def get_limiter(self, wrapper_class=None):
+        """
+        Get the RequestLimiter of the requests of a wrapper class (see limits)
+
+        :param wrapper_class: BaseApiWrapper subclass (None for 'default')
+        :returns: RequestLimiter or None
+        """
+        if not self.limits:
+            return None
+        if wrapper_class not in self._limiters:
+            limiter = None
+            for klass in getattr(wrapper_class, '__mro__', ()):
+                limiter = self.limits.get(klass) or self.limits.get(klass.__name__)
+                if limiter:
+                    break
+            self._limiters[wrapper_class] = limiter or self.limits.get('default')
+        return self._limiters[wrapper_class]
+
+    def request(self, method, url, wrapper_class=None, **kwargs):
         """
         Use 'requests' lib to apply request with current session if logged.
+        Failed requests are retried according to retry_policy.
 
         :param method (str):   the method name
         :param url (str):      the full url
+        :param wrapper_class:  wrapper class doing the request (see limits)
         :param headers (dict): the headers
         :param params (dict):  requests parameters
         :param data:           data to push with the request
@@ -61,24 +130,88 @@ class Session(object):
         :returns: requests.Response
         """
         # print(locals())
+        if self.accept_encoding:
+            headers = dict(kwargs.get('headers') or {})
+            if 'Accept-Encoding' not in headers:
+                headers['Accept-Encoding'] = self.accept_encoding
+            kwargs['headers'] = headers
+        limiter = self.get_limiter(wrapper_class)
+        policy = self.retry_policy
+        data = kwargs.get('data')
+        if not policy or not policy.can_resend(data):
+            return self._request(limiter, method, url, **kwargs)
+        policy.on_request(url)
+        position = data.tell() if hasattr(data, 'tell') else None
+        attempt = 0
+        while True:
+            try:
+                ret = self._request(limiter, method, url, **kwargs)
+            except NextCloudConnectionError as nxc_error:
+                delay = policy.get_delay(method, url, attempt, error=nxc_error.obj)
+                if delay is None:
+                    raise
+            else:
+                delay = policy.get_delay(method, url, attempt, response=ret)
+                if delay is None:
+                    return ret
+                ret.close()
+            attempt += 1
+            _LOGGER.warning('Retry %s %s in %.1f seconds (retry %s)',
+                            method.upper(), url, delay, attempt)
+            policy.sleep(delay)
+            if position is not None:
+                data.seek(position)
+
+    def _request(self, limiter, method, url, **kwargs):
+        token = limiter.acquire() if limiter else None
+        status_code = latency = None
         try:
             if self.session:
                 ret = self.session.request(method=method, url=url, **kwargs)
             else:
-                _kwargs = self._session_kwargs
+                # copy : the request may be done concurrently
+                _kwargs = dict(self._session_kwargs)
                 _kwargs.update(kwargs)
                 if not kwargs.get('auth', False):
                     _kwargs['auth'] = self.auth
-                ret = requests.request(method, url, **_kwargs)
+                if self.transport:
+                    # not closed : it would close the transport
+                    ret = self._mount_transport(requests.Session()).request(
+                        method, url, **_kwargs)
+                else:
+                    ret = requests.request(method, url, **_kwargs)
                 # print(ret.status_code)
                 # if ret.status_code == HTTP_CODES.unauthorized:
                 #     raise NextCloudConnectionError(
                 #         'Not authorized', url, method)
+            status_code = ret.status_code
+            if self._is_latency_sample(kwargs.get('data')):
+                # time to the response headers (content not included)
+                latency = ret.elapsed.total_seconds()
             return ret
         except requests.RequestException as request_error:
             raise NextCloudConnectionError(
                 'Failed to establish connection to NextCloud',
                 getattr(request_error.request, 'url', None), request_error)
+        finally:
+            if limiter:
+                limiter.release(token, status_code, latency)
+
+    def _is_latency_sample(self, data):
+        if data is None or isinstance(data, dict):
+            return True
+        return isinstance(data, (bytes, six.text_type)) and len(data) <= self.LATENCY_MAX_BODY
+
+    def _mount_transport(self, session):
+        if self.transport:
+            session.mount('https://', self.transport)
+            session.mount('http://', self.transport)
+            session.trust_env = getattr(self.transport, 'trust_env', session.trust_env)
+        else:
+            # To avoid deadlocks on "Resetting dropped connection"
+            # (retries are done by request, see retry_policy)
+            session.mount('https://', requests.adapters.HTTPAdapter())
+        return session
 
     def login(self, user=None, password=None, auth=None, client=None):
         """Create a stable session on the server.
@@ -89,28 +222,25 @@ class Session(object):
         :param client: object for any auth method
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-        # To avoid deadlocks on "Resetting dropped connection"
-        adapter = requests.adapters.HTTPAdapter()
-        # adapter.max_retries = CustomRetry(status_forcelist=[ 502, 503, 504 ])
-        adapter.max_retries = requests.packages.urllib3.util.retry.Retry(
-            status_forcelist=[ 502, 503, 504 ]
-        )
-        #
-        self.session = requests.Session()
-        #
-        self.session.mount('https://', adapter)
+        self.session = self._mount_transport(requests.Session())
         #
         for k in self._session_kwargs:
             setattr(self.session, k, self._session_kwargs[k])
 
         self._set_credentials(user, password, auth)
         self.session.auth = self.auth
+        if self._restore_state():
+            # the session was checked by the process which saved it
+            return
         if client:
             login_check_func = self._login_check
             if isinstance(login_check_func, str):
                 login_check_func = getattr(client, login_check_func)
             if self._login_check:
-                self._check_login(login_check_func, retry=[20, 60, 20, 60])
+                # the check requests are retried by retry_policy (backoff,
+                # Retry-After of the brute force protection, retry budgets)
+                self._check_login(login_check_func)
+                self.save_state()
 
     def _check_login(self, check_func, retry=None):
         # :param retry: int (number of retries) or list of int (delays)
@@ -121,15 +251,13 @@ class Session(object):
         #  if you wait 20 seconds, there is 1/3 chance of success
         #  if you wait 1 minute, there is 100% chance of success
         def _raise(retry, error):
-            is_retriable=(
+            is_retriable = (
                 isinstance(error.obj, requests.exceptions.ConnectionError)
                 or
-                isinstance(error.obj, requests.exceptions.SSLError)
-                or
-                isinstance(error.obj, requests.exceptions.MaxRetryError)
+                isinstance(error.obj, requests.exceptions.RetryError)
                 or (
-                    isinstance(nxc_error.obj, BaseResponse) and
-                    nxc_error.obj.status_code not in [
+                    isinstance(error.obj, BaseResponse) and
+                    error.obj.status_code not in [
                         ExternalApiCodes.NOT_AUTHORIZED,
                         ExternalApiCodes.UNAUTHORIZED
                     ])
@@ -142,16 +270,20 @@ class Session(object):
                     retry -= 1
                 else:
                     retry = False
+                if isinstance(error.obj, BaseResponse) and self.retry_policy:
+                    # e.g. 429 of the brute force protection
+                    delay = max(delay, self.retry_policy.get_retry_after(error.obj.raw) or 0)
                 _LOGGER.warning('Retry session check (%s) in %s seconds',
                                 self.login_url, delay)
                 time.sleep(delay)
                 _LOGGER.warning('Retry session check (%s)', self.login_url)
-                return self._check_login(client, retry=retry)
+                return self._check_login(check_func, retry=retry)
             self.logout()
             raise error
 
         try:
-            if not check_func().is_ok:
+            resp = check_func()
+            if not resp.is_ok:
                 raise NextCloudLoginError(
                     'Failed to login to NextCloud', self.login_url, resp)
         except NextCloudConnectionError as nxc_error:
@@ -162,13 +294,45 @@ class Session(object):
             self.logout()
             raise any_error
 
-    def logout(self):
+    def _get_state_key(self):
+        return 'cookies:%s@%s' % (self.user, self.url)
+
+    def _restore_state(self):
+        saved = self.state_store.get(self._get_state_key()) if self.state_store else None
+        if not saved or time.time() - saved['timestamp'] > self.COOKIES_TTL:
+            return False
+        for cookie in saved['cookies']:
+            self.session.cookies.set(**cookie)
+        return bool(saved['cookies'])
+
+    def save_state(self):
+        """ Save the cookies of the persistent session in state_store """
+        if not (self.state_store and self.session):
+            return
+        cookies = [
+            {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+             'path': cookie.path, 'secure': cookie.secure, 'expires': cookie.expires}
+            for cookie in self.session.cookies
+        ]
+        if cookies:
+            self.state_store.set(self._get_state_key(),
+                                 {'timestamp': time.time(), 'cookies': cookies})
+
+    def clear_state(self):
+        """ Forget the cookies saved in state_store """
+        if self.state_store:
+            self.state_store.delete(self._get_state_key())
+
+    def logout(self, save_state=True):
         """Log out the authenticated user and close the session.
 
+        :param save_state: save the cookies in state_store (see save_state)
         :returns: True if the operation succeeded
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
         if self.session:
+            if save_state:
+                self.save_state()
             self.session.close()
             self.session = None
         return True
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Transports of the requests : requests adapters (see requests.adapters.BaseAdapter)
+sending a PreparedRequest and returning a requests.Response.
+
+The transport of a Session is given with the 'transport' key of session_kwargs,
+the default one being requests.adapters.HTTPAdapter (HTTP/1.1 with urllib3).
+"""
+import base64
+import hashlib
+import io
+import json
+import threading
+
+import requests
+import six
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.cookies import extract_cookies_to_jar
+from six.moves import http_client
+from six.moves.urllib.parse import urlsplit
+
+from .common.streams import CHUNK_SIZE, is_buffer, is_file
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def _iter_body(body):
+    """ Get a request body that httpx can send (bytes or iterator of bytes) """
+    if body is None or isinstance(body, bytes):
+        return body
+    if is_buffer(body):
+        view = memoryview(body)
+        return (bytes(view[start:start + CHUNK_SIZE])
+                for start in range(0, len(view), CHUNK_SIZE))
+    if is_file(body):
+        return iter(lambda: body.read(CHUNK_SIZE), b'')
+    if hasattr(body, 'encode'):
+        return body.encode('utf-8')
+    return (chunk.encode('utf-8') if hasattr(chunk, 'encode') else chunk
+            for chunk in body)
+
+
+# pylint: disable=useless-object-inheritance
+class _OriginalResponse(object):
+    """ Headers of a response, as read by the cookie jar of requests """
+
+    def __init__(self, headers):
+        self.msg = http_client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+
+    def info(self):
+        """ Headers """
+        return self.msg
+
+
+# pylint: disable=useless-object-inheritance
+class _HTTPXStream(object):
+    """ File-like object reading the (decoded) content of a httpx response """
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes(CHUNK_SIZE)
+        self._buffer = b''
+        self._original_response = _OriginalResponse(response.headers.multi_items())
+        self.decode_content = True
+
+    def tell(self):
+        """ Number of bytes received (before decompression) """
+        return self._response.num_bytes_downloaded
+
+    def read(self, size=-1, **_kwargs):
+        """ Read size bytes (all the content if size < 0) """
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def stream(self, chunk_size=CHUNK_SIZE, **_kwargs):
+        """ Iterate over the content """
+        for chunk in iter(lambda: self.read(chunk_size), b''):
+            yield chunk
+
+    def close(self):
+        """ Close the response """
+        self._response.close()
+
+    def release_conn(self):
+        """ Release the connection (see requests.Response.close) """
+        self._response.close()
+
+
+class HTTPXTransport(BaseAdapter):
+    """
+    Transport using httpx, with HTTP/2 : concurrent requests to the server
+    are multiplexed on a single connection (thread-safe).
+
+    Requires httpx and h2 (pip install nextcloud-api-wrapper[http2])::
+
+      >>> nxc = NextCloud('https://nextcloud.mysite.com', user='admin', password='admin',
+      ...                 session_kwargs={'transport': HTTPXTransport()})
+
+    :param http2: use HTTP/2 (if the server supports it)
+    :param client_kwargs: arguments of httpx.Client (limits, proxies...),
+                          verify and cert are taken from the requests if not given
+    """
+
+    def __init__(self, http2=True, **client_kwargs):
+        if httpx is None:
+            raise ImportError(
+                'HTTPXTransport requires httpx (pip install nextcloud-api-wrapper[http2])')
+        super(HTTPXTransport, self).__init__()
+        self.http2 = http2
+        self.client_kwargs = client_kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self, verify, cert):
+        with self._lock:
+            if self._client is None:
+                client_kwargs = {'verify': verify, 'cert': cert}
+                client_kwargs.update(self.client_kwargs)
+                self._client = httpx.Client(http2=self.http2, **client_kwargs)
+            return self._client
+
+    @staticmethod
+    def _get_timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(None, connect=connect, read=read)
+        return httpx.Timeout(timeout)
+
+    # pylint: disable=too-many-arguments
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):
+        """ Send a PreparedRequest, return a requests.Response """
+        client = self._get_client(verify, cert)
+        httpx_request = client.build_request(
+            request.method, request.url, headers=dict(request.headers),
+            content=_iter_body(request.body), timeout=self._get_timeout(timeout))
+        try:
+            httpx_response = client.send(httpx_request, stream=True)
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.Timeout(error, request=request)
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(error, request=request)
+        return self.build_response(request, httpx_response)
+
+    @staticmethod
+    def build_response(request, httpx_response):
+        """ Build a requests.Response from a (streamed) httpx.Response """
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(httpx_response.headers.items())
+        response.raw = _HTTPXStream(httpx_response)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+        return response
+
+    def close(self):
+        """ Close the connections (a new client is created at next request) """
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+
+class _BytesStream(io.BytesIO):
+    """ Raw content of a replayed response (see requests.Response.raw) """
+    decode_content = True
+
+    def read(self, size=-1, **_kwargs):  # pylint: disable=arguments-differ
+        return super(_BytesStream, self).read(-1 if size is None else size)
+
+    def stream(self, chunk_size=CHUNK_SIZE, **_kwargs):
+        """ Iterate over the content """
+        for chunk in iter(lambda: self.read(chunk_size), b''):
+            yield chunk
+
+    def release_conn(self):
+        """ Nothing to release """
+
+
+def _get_request_key(method, url, body=None):
+    parts = urlsplit(url)
+    key = '%s %s' % (method.upper(), parts.path + ('?' + parts.query if parts.query else ''))
+    if body is not None:
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        key += ' ' + hashlib.sha1(body).hexdigest()
+    return key
+
+
+# pylint: disable=useless-object-inheritance
+class _Recorded(object):
+    """ Recorded response, ready to be replayed """
+
+    def __init__(self, interaction):
+        response = interaction['response']
+        self.status_code = response['status_code']
+        self.reason = response.get('reason')
+        self.header_items = [tuple(item) for item in response['headers']]
+        self.headers = CaseInsensitiveDict(self.header_items)
+        if 'body_base64' in response:
+            self.body = base64.b64decode(response['body_base64'])
+        else:
+            self.body = response.get('body', '').encode('utf-8')
+        self.has_cookies = 'set-cookie' in self.headers
+
+
+class ReplayTransport(BaseAdapter):
+    """
+    Transport serving the responses recorded in a cassette (see RecordingTransport),
+    without network : e.g. to test or to measure the client overhead.
+
+    Requests are matched on method and path (and body if match_body), the recorded
+    responses of a request being served in order (from the beginning again
+    when all of them were served).
+
+    :param cassette:   cassette file, or list of interactions
+    :param match_body: also match the (bytes) bodies of the requests
+    """
+    # environment settings (proxies, certificates) are not used
+    trust_env = False
+
+    def __init__(self, cassette, match_body=False):
+        super(ReplayTransport, self).__init__()
+        if not isinstance(cassette, list):
+            with open(cassette) as cassette_file:
+                cassette = json.load(cassette_file)['interactions']
+        self.match_body = match_body
+        self._responses = {}
+        self._positions = {}
+        for interaction in cassette:
+            request = interaction['request']
+            key = _get_request_key(request['method'], request['url'])
+            if match_body and 'body_sha1' in request:
+                key += ' ' + request['body_sha1']
+            self._responses.setdefault(key, []).append(_Recorded(interaction))
+        self._lock = threading.Lock()
+
+    def _get_recorded(self, request):
+        body = request.body if self.match_body and isinstance(
+            request.body, (bytes, six.text_type)) else None
+        keys = [_get_request_key(request.method, request.url, body)]
+        if body is not None:
+            keys.append(_get_request_key(request.method, request.url))
+        for key in keys:
+            responses = self._responses.get(key)
+            if responses:
+                with self._lock:
+                    position = self._positions.get(key, 0)
+                    self._positions[key] = (position + 1) % len(responses)
+                return responses[position]
+        return None
+
+    # pylint: disable=too-many-arguments
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):
+        """ Get the recorded response of a PreparedRequest """
+        recorded = self._get_recorded(request)
+        if recorded is None:
+            raise requests.exceptions.RequestException(
+                'No recorded response for %s %s' % (request.method, request.url),
+                request=request)
+        response = requests.Response()
+        response.status_code = recorded.status_code
+        response.reason = recorded.reason
+        response.headers = recorded.headers.copy()
+        response.raw = _BytesStream(recorded.body)
+        if not stream:
+            response.raw.seek(0, io.SEEK_END)
+            response._content = recorded.body  # pylint: disable=protected-access
+        response.url = request.url
+        response.request = request
+        if recorded.has_cookies:
+            # pylint: disable=protected-access, attribute-defined-outside-init
+            response.raw._original_response = _OriginalResponse(recorded.header_items)
+            extract_cookies_to_jar(response.cookies, request, response.raw)
+        return response
+
+    def close(self):
+        """ Nothing to close """
+
+
+class RecordingTransport(BaseAdapter):
+    """
+    Transport recording the requests sent by another transport in a cassette
+    (JSON file, see ReplayTransport), saved when the transport is closed
+    (e.g. at logout) or with save.
+
+    :param cassette:  cassette file
+    :param transport: transport sending the requests (default: HTTPAdapter)
+    """
+    # transfer headers of the original response, not valid for the recorded content
+    SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, cassette, transport=None):
+        super(RecordingTransport, self).__init__()
+        self.cassette = cassette
+        self.transport = transport or requests.adapters.HTTPAdapter()
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):
+        """ Send a PreparedRequest with the transport, and record the response """
+        response = self.transport.send(request, stream=stream, timeout=timeout,
+                                       verify=verify, cert=cert, proxies=proxies)
+        content = response.content
+        if stream:
+            # the content was read to be recorded
+            response.raw = _BytesStream(content)
+        recorded_request = {'method': request.method, 'url': request.url}
+        if isinstance(request.body, (bytes, six.text_type)):
+            body = request.body
+            recorded_request['body_sha1'] = hashlib.sha1(
+                body if isinstance(body, bytes) else body.encode('utf-8')).hexdigest()
+        recorded_response = {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': [[name, value] for name, value in self._get_header_items(response)
+                        if name.lower() not in self.SKIPPED_HEADERS],
+        }
+        try:
+            recorded_response['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            recorded_response['body_base64'] = base64.b64encode(content).decode('ascii')
+        with self._lock:
+            self.interactions.append(
+                {'request': recorded_request, 'response': recorded_response})
+        return response
+
+    @staticmethod
+    def _get_header_items(response):
+        original = getattr(response.raw, '_original_response', None)
+        if original is not None and hasattr(original, 'msg'):
+            return list(original.msg.items())
+        return list(response.headers.items())
+
+    def save(self):
+        """ Save the recorded interactions in the cassette """
+        with self._lock:
+            with open(self.cassette, 'w') as cassette_file:
+                json.dump({'interactions': self.interactions}, cassette_file, indent=1)
+
+    def close(self):
+        """ Save the cassette and close the transport """
+        self.save()
+        self.transport.close()
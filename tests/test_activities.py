@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
 from .base import BaseTestCase
 
 
@@ -42,3 +46,23 @@ class TestActivities(BaseTestCase):
             for each in data:
                 assert each['object_id'] == object_to_filter_by['object_id']
                 assert each['object_type'] == object_to_filter_by['object_type']
+
+    def test_iter_activities(self):
+        all_ids = [activity['activity_id'] for activity in self.nxc.iter_activities(page_size=2)]
+        assert all_ids == sorted(set(all_ids))
+
+        checkpoint_dir = tempfile.mkdtemp()
+        try:
+            checkpoint = os.path.join(checkpoint_dir, 'activities.json')
+            ids = []
+            for activity in self.nxc.iter_activities(page_size=2, checkpoint=checkpoint):
+                ids.append(activity['activity_id'])
+                if len(ids) == 3:
+                    break
+            # continue after the last given activity
+            ids += [activity['activity_id']
+                    for activity in self.nxc.iter_activities(page_size=2, checkpoint=checkpoint)]
+            assert ids == all_ids
+            assert not list(self.nxc.iter_activities(checkpoint=checkpoint))
+        finally:
+            shutil.rmtree(checkpoint_dir)
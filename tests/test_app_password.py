@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from nextcloud import TokenStore
+from nextcloud.common.state import MemoryStateStore
+from nextcloud.transport import ReplayTransport
+
+from .base import BaseTestCase, NextCloud, NEXTCLOUD_URL, NEXTCLOUD_USERNAME, NEXTCLOUD_PASSWORD
+
+
+class TestAppPassword(BaseTestCase):
+
+    def setUp(self):
+        super(TestAppPassword, self).setUp()
+        self.store_dir = tempfile.mkdtemp()
+        self.token_store = TokenStore(os.path.join(self.store_dir, 'tokens.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+        super(TestAppPassword, self).tearDown()
+
+    def get_client(self):
+        return NextCloud(NEXTCLOUD_URL, NEXTCLOUD_USERNAME, NEXTCLOUD_PASSWORD,
+                         token_store=self.token_store)
+
+    def test_login_with_app_password(self):
+        nxc = self.get_client()
+        app_password = nxc.login_with_app_password()
+        assert nxc.session.auth == (NEXTCLOUD_USERNAME, app_password)
+        assert nxc.get_user().is_ok
+        assert self.token_store.get(nxc.url, NEXTCLOUD_USERNAME) == app_password
+        nxc.logout()
+
+        # the saved app password is reused
+        other_nxc = self.get_client()
+        assert other_nxc.login_with_app_password() == app_password
+        assert other_nxc.get_user().is_ok
+
+        # rotate app password
+        res = other_nxc.rotate_app_password()
+        assert res.is_ok
+        new_app_password = res.data['apppassword']
+        assert new_app_password != app_password
+        assert self.token_store.get(nxc.url, NEXTCLOUD_USERNAME) == new_app_password
+        assert other_nxc.get_user().is_ok
+
+        # revoke app password
+        other_nxc.logout(revoke_app_password=True)
+        assert self.token_store.get(nxc.url, NEXTCLOUD_USERNAME) is None
+        revoked_nxc = NextCloud(NEXTCLOUD_URL, NEXTCLOUD_USERNAME, new_app_password)
+        assert not revoked_nxc.get_user().is_ok
+
+    def test_start_login_flow(self):
+        res = self.nxc.start_login_flow()
+        assert res.is_ok
+        assert res.json_data['login']
+        # not granted yet
+        res = self.nxc.poll_login_flow(res.json_data['poll']['token'])
+        assert res.status_code == self.NOT_FOUND_CODE
+
+
+class TestRevokedAppPassword(TestCase):
+
+    USER_URL = 'http://host/ocs/v1.php/cloud/users/user?format=json'
+    APP_PASSWORD_URL = 'http://host/ocs/v2.php/core/getapppassword?format=json'
+
+    @staticmethod
+    def get_interaction(url, status_code, ocs_code, data):
+        body = {'ocs': {'meta': {'statuscode': ocs_code}, 'data': data}}
+        return {'request': {'method': 'GET', 'url': url},
+                'response': {'status_code': status_code, 'reason': '',
+                             'headers': [['Content-Type', 'application/json']],
+                             'body': json.dumps(body)}}
+
+    def test_revoked_app_password(self):
+        token_store = TokenStore(store=MemoryStateStore())
+        token_store.set('http://host', 'user', 'revoked')
+        transport = ReplayTransport([
+            self.get_interaction(self.USER_URL, 401, 997, []),
+            self.get_interaction(self.USER_URL, 200, 100, {'id': 'user'}),
+            self.get_interaction(self.APP_PASSWORD_URL, 200, 200, {'apppassword': 'new'}),
+        ])
+        nxc = NextCloud('http://host', 'user', 'password', token_store=token_store,
+                        session_kwargs={'transport': transport, 'on_session_login': 'get_user'})
+        # a new app password replaces the revoked one
+        assert nxc.login_with_app_password() == 'new'
+        assert nxc.session.auth == ('user', 'new')
+        assert token_store.get('http://host', 'user') == 'new'
+        nxc.logout()
@@ -1,4 +1,10 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from nextcloud import FileStateStore, DbmStateStore
+
 from . import base
 
 
@@ -28,3 +34,28 @@ def test_ok():
             base.NEXTCLOUD_USERNAME, base.NEXTCLOUD_PASSWORD)
     issues = nxc.get_connection_issues()
     assert not issues
+
+
+def test_state_store():
+    state_dir = tempfile.mkdtemp()
+    try:
+        for state_store in [FileStateStore(os.path.join(state_dir, 'state.json')),
+                            DbmStateStore(os.path.join(state_dir, 'state.db'))]:
+            nxc = base.NextCloud(
+                base.NEXTCLOUD_URL, base.NEXTCLOUD_USERNAME, base.NEXTCLOUD_PASSWORD,
+                state_store=state_store, session_kwargs={'on_session_login': 'get_user'})
+            nxc.login()
+            assert nxc.get_cached_capabilities().major_version
+            nxc.logout()
+            assert state_store.get('capabilities:' + base.NEXTCLOUD_URL)
+
+            # the cookies are reused
+            other_nxc = base.NextCloud(
+                base.NEXTCLOUD_URL, base.NEXTCLOUD_USERNAME, base.NEXTCLOUD_PASSWORD,
+                state_store=state_store, session_kwargs={'on_session_login': 'get_user'})
+            other_nxc.login()
+            assert len(other_nxc.session.session.cookies)
+            assert other_nxc.get_user().is_ok
+            other_nxc.logout()
+    finally:
+        shutil.rmtree(state_dir)
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
 from .base import BaseTestCase, NEXTCLOUD_VERSION
 
+from nextcloud.api_wrappers.capabilities import Capabilities
+
 
 class TestCapabilities(BaseTestCase):
 
@@ -8,3 +15,20 @@ class TestCapabilities(BaseTestCase):
         res = self.nxc.get_capabilities()
         assert res.is_ok
         assert str(res.data['version']['major']) == NEXTCLOUD_VERSION
+
+    def test_get_cached_capabilities(self):
+        caps = self.nxc.get_cached_capabilities()
+        assert str(caps.major_version) == NEXTCLOUD_VERSION
+        assert self.nxc.get_server_major_version() == caps.major_version
+        assert self.nxc.has_capability('core')
+        assert not self.nxc.has_capability('core', 'not-a-capability')
+
+        # cached capabilities are used, until the cache is cleared
+        with patch.object(Capabilities, 'get_capabilities') as mock_method:
+            self.nxc.get_cached_capabilities()
+            assert not mock_method.called
+        self.nxc.clear_capabilities_cache()
+        with patch.object(Capabilities, 'get_capabilities',
+                          wraps=self.nxc.get_capabilities) as mock_method:
+            self.nxc.get_cached_capabilities()
+            assert mock_method.called
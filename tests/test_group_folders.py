@@ -108,6 +108,27 @@ class TestGroupFolders(BaseTestCase):
         # clear
         self.clear(group_folder_ids=[group_folder_id])
 
+    def test_submit_folder_quotas(self):
+        # create new group folders concurrently
+        mount_points = ["test_submit_quotas_" + self.get_random_string(length=4)
+                        for _ in range(3)]
+        futures = [self.nxc.submit.create_group_folder(mount_point)
+                   for mount_point in mount_points]
+        group_folder_ids = [future.result().data['id'] for future in futures]
+
+        # set quotas concurrently
+        quotas = dict((group_folder_id, (i + 1) * 1024 * 1024)
+                      for i, group_folder_id in enumerate(group_folder_ids))
+        futures = [self.nxc.submit.set_quota_of_group_folder(group_folder_id, quota)
+                   for group_folder_id, quota in quotas.items()]
+        assert all(future.result().is_ok for future in futures)
+        for group_folder_id, quota in quotas.items():
+            res = self.nxc.get_group_folder(group_folder_id)
+            assert str(res.data['quota']) == str(quota)
+
+        # clear
+        self.clear(group_folder_ids=group_folder_ids)
+
     def test_setting_folder_permissions(self):
         # create group to share with
         group_id = 'test_folders_' + self.get_random_string(length=4)
@@ -87,3 +87,36 @@ class TestUserLDAP(BaseTestCase):
                 setter_method = getattr(self.nxc, setter_name)
                 setter_method(config_id, value)
                 mock_method.assert_called_with(config_id, data={ldap_key: value})
+
+    def test_ldap_config_snapshot(self):
+        res = self.nxc.create_ldap_config()
+        assert res.is_ok
+        config_id = res.data['configID']
+        config_data = self.nxc.get_ldap_config(config_id).data
+
+        snapshot = self.nxc.get_ldap_config_snapshot(config_id)
+        with patch.object(UserLDAP, 'get_ldap_config',
+                          wraps=self.nxc.get_ldap_config) as mock_method:
+            assert snapshot.get_ldap_paging_size() == config_data['ldapPagingSize']
+            assert snapshot.get_ldap_cache_ttl() == config_data['ldapCacheTTL']
+            assert snapshot.get_ldap_host() == config_data['ldapHost']
+            assert mock_method.call_count == 1
+
+        snapshot.set_ldap_paging_size(777)
+        snapshot.set_ldap_cache_ttl(42)
+        assert snapshot.get_ldap_paging_size() == 777
+        with patch.object(UserLDAP, 'edit_ldap_config',
+                          wraps=self.nxc.edit_ldap_config) as mock_method:
+            res = snapshot.commit()
+            assert res.is_ok
+            mock_method.assert_called_once_with(
+                config_id, data={'ldapPagingSize': 777, 'ldapCacheTTL': 42})
+
+        # snapshot is fetched again after the update
+        assert str(snapshot.get_ldap_paging_size()) == '777'
+        assert str(snapshot.get_ldap_cache_ttl()) == '42'
+
+        res = self.nxc.ldap_cache_flush(config_id, snapshot=snapshot)
+        assert res.is_ok
+
+        self.nxc.delete_ldap_config(config_id)
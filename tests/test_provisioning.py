@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from .base import BaseTestCase
+
+from nextcloud import provisioning
+
+
+class TestProvisioning(BaseTestCase):
+
+    def setUp(self):
+        super(TestProvisioning, self).setUp()
+        self.user_username = self.get_random_string(length=4) + "_provisioned"
+        self.group_name = self.get_random_string(length=4) + "_provisioned"
+        self.plan = {
+            'groups': [self.group_name],
+            'users': {
+                self.user_username: {
+                    'password': self.get_random_string(length=10),
+                    'displayname': 'Provisioned user',
+                    'groups': [self.group_name],
+                    'subadmin': [self.group_name],
+                },
+            },
+        }
+
+    def tearDown(self):
+        self.nxc.delete_user(self.user_username)
+        self.nxc.delete_group(self.group_name)
+        super(TestProvisioning, self).tearDown()
+
+    def test_dry_run(self):
+        operations = provisioning.apply(self.nxc, self.plan, dry_run=True)
+        methods = [operation.method for operation in operations]
+        assert methods == ['add_group', 'add_user', 'edit_user',
+                           'add_to_group', 'create_subadmin']
+        assert not any(operation.done for operation in operations)
+        assert not self.nxc.get_user(self.user_username).is_ok
+
+    def test_apply(self):
+        operations = provisioning.apply(self.nxc, self.plan, max_workers=4)
+        assert all(operation.is_ok for operation in operations)
+        user = self.nxc.get_user(self.user_username).data
+        assert user['displayname'] == 'Provisioned user'
+        assert self.group_name in user['groups']
+        assert self.group_name in self.nxc.get_subadmin_groups(self.user_username).data
+
+        # nothing left to do
+        assert provisioning.apply(self.nxc, self.plan, dry_run=True) == []
+
+        # prune memberships
+        self.plan['users'][self.user_username]['groups'] = []
+        operations = provisioning.apply(self.nxc, self.plan, prune=True)
+        assert [operation.method for operation in operations] == ['remove_from_group']
+        assert all(operation.is_ok for operation in operations)
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 # -*- coding: utf-8 -*-
+import time
 from unittest import TestCase
-from .base import BaseTestCase
+from .base import BaseTestCase, NEXTCLOUD_SSL_ENABLED
+from nextcloud import NextCloud, RetryPolicy, RequestLimiter, AdaptiveLimiter, HTTPXTransport
+from nextcloud.api_wrappers import WebDAV, GroupFolders
 from nextcloud.base import BaseApiWrapper
-from nextcloud.session import NextCloudConnectionError
+from nextcloud.session import NextCloudConnectionError, NextCloudLoginError
+from nextcloud.transport import ReplayTransport
 
 class DummyWrapper(BaseApiWrapper):
     API_URL = '/wrong'
@@ -25,3 +29,153 @@ class TestRequester(BaseTestCase):
             assert wrong_url in str(e)
         assert exception_raised
 
+    def test_httpx_transport(self):
+        try:
+            transport = HTTPXTransport()
+        except ImportError:
+            self.skipTest('httpx is not installed')
+        nxc = self.nxc.with_attr(session_kwargs={'transport': transport,
+                                                 'verify': NEXTCLOUD_SSL_ENABLED})
+        futures = [nxc.submit.list_folders() for _ in range(10)]
+        assert all(future.result().is_ok for future in futures)
+        nxc.login()
+        assert nxc.get_user().is_ok
+        assert nxc.session.session.cookies
+        nxc.logout()
+
+
+class TestRetryPolicy(TestCase):
+
+    class Response(object):
+        def __init__(self, status_code, headers=None):
+            self.status_code = status_code
+            self.headers = headers or {}
+
+    def test_retried_statuses(self):
+        policy = RetryPolicy(total=2, budget_ratio=None)
+        url = 'http://host/ocs/v2.php/apps/groupfolders/folders'
+        # idempotent method : retried on server errors
+        assert policy.get_delay('GET', url, 0, response=self.Response(502)) is not None
+        assert policy.get_delay('GET', url, 2, response=self.Response(502)) is None
+        assert policy.get_delay('GET', url, 0, response=self.Response(404)) is None
+        # not idempotent method : retried only if not processed
+        assert policy.get_delay('POST', url, 0, response=self.Response(502)) is None
+        delay = policy.get_delay('POST', url, 0, response=self.Response(503, {'Retry-After': '7'}))
+        assert delay >= 7
+        delay = policy.get_delay('POST', url, 0, response=self.Response(429))
+        assert delay >= policy.throttle_delay
+
+    def test_retry_budget(self):
+        policy = RetryPolicy(total=10, budget_ratio=0.5, budget_min=2)
+        url = 'http://host/remote.php/dav/files/user/file.txt'
+        other_url = 'http://host/ocs/v2.php/cloud/users'
+        response = self.Response(503)
+        assert policy.get_delay('GET', url, 0, response=response) is not None
+        assert policy.get_delay('GET', url, 1, response=response) is not None
+        assert policy.get_delay('GET', url, 2, response=response) is None
+        # budgets are per endpoint
+        assert policy.get_delay('GET', other_url, 0, response=response) is not None
+        # requests refill the budget
+        policy.on_request(url)
+        policy.on_request(url)
+        assert policy.get_delay('GET', url, 0, response=response) is not None
+
+    def test_login_check_retries(self):
+        transport = ReplayTransport([
+            {'request': {'method': 'GET', 'url': 'http://host/ocs/v1.php/cloud/users/user?format=json'},
+             'response': {'status_code': 503, 'reason': 'Service Unavailable',
+                          'headers': [], 'body': ''}}])
+        sent = []
+        send = transport.send
+        transport.send = lambda request, **kwargs: sent.append(request) or send(request, **kwargs)
+        policy = RetryPolicy(total=2, backoff_factor=0, budget_ratio=None)
+        policy.sleep = lambda delay: None
+        nxc = NextCloud('http://host', 'user', 'password', session_kwargs={
+            'transport': transport, 'retry_policy': policy, 'on_session_login': 'get_user'})
+        exception_raised = False
+        try:
+            nxc.login()
+        except NextCloudLoginError:
+            exception_raised = True
+        assert exception_raised
+        # the check is not repeated : only the retries of the policy
+        assert len(sent) == 3
+
+
+class TestRequestLimiter(TestCase):
+
+    def test_adaptive_concurrency(self):
+        limiter = AdaptiveLimiter(initial_limit=8, max_limit=10, latency_tolerance=None)
+        start = limiter.acquire()
+        limiter.release(start, overloaded=True)
+        assert limiter.limit == 4
+        # additive increase
+        for _ in range(20):
+            limiter.release(limiter.acquire())
+        assert 4 < limiter.limit <= 10
+        # one decrease for concurrent requests
+        limit = limiter.limit
+        starts = [limiter.acquire() for _ in range(limit)]
+        for start in starts:
+            limiter.release(start, overloaded=True)
+        assert limiter.limit == limit // 2
+
+    def test_latency(self):
+        limiter = AdaptiveLimiter(initial_limit=8, max_limit=8, latency_tolerance=2.0)
+        for _ in range(20):
+            limiter.release(limiter.acquire(), latency=0.01)
+        assert limiter.limit == 8
+        # long transfer, or upload : no latency
+        start = limiter.acquire()
+        time.sleep(0.1)
+        limiter.release(start)
+        assert limiter.limit == 8
+        # slow response headers
+        for _ in range(10):
+            limiter.release(limiter.acquire(), latency=1.)
+        assert limiter.limit < 8
+
+    def test_limits_by_wrapper(self):
+        webdav_limiter = RequestLimiter(concurrency=AdaptiveLimiter())
+        default_limiter = RequestLimiter(rate=10, concurrency=2)
+        nxc = NextCloud('http://host', 'user', 'password', session_kwargs={'limits': {
+            'WebDAVApiWrapper': webdav_limiter, 'default': default_limiter}})
+        assert nxc.session.get_limiter(WebDAV) is webdav_limiter
+        assert nxc.session.get_limiter(GroupFolders) is default_limiter
+        assert default_limiter.concurrency.limit == 2
+
+
+class TestReplayTransport(TestCase):
+
+    INTERACTIONS = [
+        {'request': {'method': 'GET', 'url': 'http://host/ocs/v1.php/cloud/users/user?format=json'},
+         'response': {'status_code': 200, 'reason': 'OK',
+                      'headers': [['Content-Type', 'application/json'],
+                                  ['Set-Cookie', 'nc_session_id=abc; path=/']],
+                      'body': '{"ocs": {"meta": {"statuscode": 100}, "data": {"id": "user"}}}'}},
+        {'request': {'method': 'DELETE', 'url': 'http://host/remote.php/dav/files/user/file.txt'},
+         'response': {'status_code': 204, 'reason': 'No Content', 'headers': [], 'body': ''}},
+        {'request': {'method': 'DELETE', 'url': 'http://host/remote.php/dav/files/user/file.txt'},
+         'response': {'status_code': 404, 'reason': 'Not Found', 'headers': [], 'body': ''}},
+    ]
+
+    def test_replay(self):
+        nxc = NextCloud('http://host', 'user', 'password', session_kwargs={
+            'transport': ReplayTransport(self.INTERACTIONS)})
+        nxc.login()
+        res = nxc.get_user()
+        assert res.is_ok
+        assert res.data['id'] == 'user'
+        assert nxc.session.session.cookies.get('nc_session_id') == 'abc'
+        # recorded responses are served in order
+        assert nxc.delete_path('file.txt').status_code == 204
+        assert nxc.delete_path('file.txt').status_code == 404
+        assert nxc.delete_path('file.txt').status_code == 204
+        # unknown request
+        exception_raised = False
+        try:
+            nxc.get_group('group')
+        except NextCloudConnectionError:
+            exception_raised = True
+        assert exception_raised
+        nxc.logout()
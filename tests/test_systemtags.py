@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 
 from .base import BaseTestCase, LocalNxcUserMixin
 
+from nextcloud.api_wrappers.systemtags import SystemTags
+
 
 class TestSystemTags(LocalNxcUserMixin, BaseTestCase):
 
@@ -24,3 +30,87 @@ class TestSystemTags(LocalNxcUserMixin, BaseTestCase):
         tags = _nxc.get_systemtags()
         assert tag_name not in [t.display_name for t in tags]
 
+
+    def test_systemtag_id_cache(self):
+        _nxc = self.nxc
+        tag_name = self.get_random_string(length=40) + u"cached"
+
+        assert _nxc.get_systemtag_id(tag_name) is None
+        resp = _nxc.create_systemtag(tag_name)
+        assert resp.is_ok
+        tag_id = resp.data
+
+        # name lookups don't request the server
+        with patch.object(SystemTags, 'fetch_systemtags') as mock_method:
+            assert _nxc.get_systemtag_id(tag_name) == tag_id
+            assert _nxc.get_systemtag(tag_name).id == tag_id
+            assert not mock_method.called
+
+        _nxc.invalidate_systemtags_cache()
+        assert _nxc.get_systemtag_id(tag_name) == tag_id
+
+        assert _nxc.delete_systemtag(tag_name).is_ok
+        assert _nxc.get_systemtag_id(tag_name) is None
+
+    def test_systemtag_created_by_another_client(self):
+        _nxc = self.nxc
+        tag_name = self.get_random_string(length=40) + u"other"
+        assert _nxc.get_systemtag_id(tag_name) is None
+
+        # unknown to the cached tags of _nxc
+        tag_id = self.nxc_local.create_systemtag(tag_name).data
+        assert _nxc.get_systemtag_id(tag_name) == tag_id
+        assert _nxc.get_systemtag(tag_name).id == tag_id
+
+        assert _nxc.delete_systemtag(tag_id=tag_id).is_ok
+
+    def test_bulk_tag(self):
+        _nxc = self.nxc_local
+        tag_name = self.get_random_string(length=40) + u"bulk"
+        tag_id = _nxc.create_systemtag(tag_name).data
+        folder = _nxc.get_folder('bulk_tag')
+        file_names = ['file_%s' % idx for idx in range(3)]
+        for file_name in file_names:
+            folder.upload_file_contents(b'content', file_name)
+        paths = ['bulk_tag/' + file_name for file_name in file_names]
+        file_id = folder.get_file(file_names[0]).file_id
+
+        results = _nxc.bulk_tag(paths + [file_id, 'bulk_tag/missing'], [tag_name])
+        errors = {item: error for item, _tag_id, error in results}
+        assert len(results) == 5
+        assert errors['bulk_tag/missing'] is not None
+        assert all(errors[item] is None for item in paths)
+        assert errors[file_id] is None
+        related = [f.basename() for f in _nxc.get_systemtag(tag_name).get_related_files()]
+        assert sorted(related) == file_names
+
+        results = _nxc.bulk_tag(paths, [tag_id], op='remove')
+        assert all(error is None for _item, _tag_id, error in results)
+        assert not _nxc.get_systemtag(tag_name).get_related_files()
+
+        folder.delete(recursive=True)
+        _nxc.delete_systemtag(tag_id=tag_id)
+
+    def test_iter_files_by_tags(self):
+        _nxc = self.nxc_local
+        tag_names = [self.get_random_string(length=40) + suffix for suffix in (u"iter_a", u"iter_b")]
+        tag_ids = [_nxc.create_systemtag(tag_name).data for tag_name in tag_names]
+        folder = _nxc.get_folder('iter_tags')
+        file_names = ['file_%s' % idx for idx in range(3)]
+        for file_name in file_names:
+            folder.upload_file_contents(b'content', file_name)
+        paths = ['iter_tags/' + file_name for file_name in file_names]
+        _nxc.bulk_tag(paths, [tag_ids[0]])
+        _nxc.bulk_tag(paths[:1], [tag_ids[1]])
+
+        tag = _nxc.get_systemtag(tag_names[0])
+        related = [f.basename() for f in tag.iter_related_files(page_size=2)]
+        assert sorted(related) == file_names
+        related = [f.basename() for f in _nxc.iter_files_by_tags(tag_names, page_size=1)]
+        assert sorted(related) == file_names
+        related = [f.basename() for f in _nxc.iter_files_by_tags(tag_ids, mode='and')]
+        assert related == file_names[:1]
+
+        folder.delete(recursive=True)
+        for tag_id in tag_ids:
+            _nxc.delete_systemtag(tag_id=tag_id)
@@ -23,6 +23,19 @@ class TestUsers(BaseTestCase):
         assert user['id'] == self.username
         assert user['enabled']
 
+    def test_get_users_details(self):
+        unknown_username = self.get_random_string(length=8) + "_unknown"
+        res = self.nxc.get_users_details([self.username, unknown_username],
+                                         max_workers=2, rate_limit=10)
+        details = {uid: (data, error) for uid, data, error in res}
+        assert set(details) == {self.username, unknown_username}
+        data, error = details[self.username]
+        assert error is None
+        assert data['id'] == self.username
+        data, error = details[unknown_username]
+        assert data is None
+        assert error.obj.status_code == self.NOT_FOUND_CODE
+
     def test_add_user(self):
         new_user_username = self.get_random_string(length=4) + "test_add"
         res = self.nxc.add_user(new_user_username, self.get_random_string(length=8))
@@ -1,18 +1,31 @@
 # -*- coding: utf-8 -*-
+import io
 import os
+import shutil
+import tempfile
+import zipfile
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 # from requests.utils import quote  # url are always unquotted
 from datetime import datetime
+from unittest import TestCase
 
 from .base import BaseTestCase, LocalNxcUserMixin
+from nextcloud import NextCloud, MetadataCache, ContentCache, FileIdCache
 from nextcloud.api_wrappers import WebDAV
-from nextcloud.api_wrappers.webdav import timestamp_from_string, File
+from nextcloud.api_wrappers.webdav import timestamp_from_string, File, NextCloudDirectoryNotEmpty
+from nextcloud.transport import ReplayTransport
 
 
 class TestWebDAV(LocalNxcUserMixin, BaseTestCase):
 
+    OK_CODE = 200
     CREATED_CODE = 201
     NO_CONTENT_CODE = 204
     MULTISTATUS_CODE = 207
+    NOT_MODIFIED_CODE = 304
     ALREADY_EXISTS_CODE = 405
     PRECONDITION_FAILED_CODE = 412
 
@@ -36,6 +49,11 @@ class TestWebDAV(LocalNxcUserMixin, BaseTestCase):
         assert isinstance(res.data[0], File)
         assert isinstance(res.data[0].href, str)
 
+    def test_iter_folders(self):
+        files = list(self.nxc_local.iter_folders(fields=['file_id']))
+        assert files == self.nxc_local.list_folders(fields=['file_id']).data
+        assert all(isinstance(file_data, File) for file_data in files)
+
     def test_upload_download_file(self):
         file_name = "test_file"
         file_content = "test file content"
@@ -313,6 +331,218 @@ class TestWebDAV(LocalNxcUserMixin, BaseTestCase):
         assert downloaded_file_content == file_content
         assert downloaded_file_content != new_file_content
 
+    def test_file_id_cache(self):
+        file_name = "test_file_id_cache"
+        self.create_and_upload_file(file_name, "test file id cache")
+        cache = self.nxc_local.file_id_cache
+        assert cache.get_file_id(file_name) is None
+        file_data = self.nxc_local.get_file(file_name, fields=['file_id', 'etag'])
+        assert cache.get_file_id(file_name) == file_data.file_id
+        assert cache.get_etag(file_name) == file_data.etag
+        assert cache.get_path(file_data.file_id) == file_name
+
+        destination_path = "test_file_id_cache_moved"
+        res = self.nxc_local.move_path(file_name, destination_path)
+        assert res.is_ok
+        assert cache.get_file_id(file_name) is None
+        self.nxc_local.list_folders(depth=1, fields=['file_id'])
+        assert cache.get_file_id(destination_path) == file_data.file_id
+        self.nxc_local.delete_path(destination_path)
+        assert cache.get_file_id(destination_path) is None
+        os.remove(file_name)
+
+    def test_file_id_cache_expiry(self):
+        file_name = "test_file_id_cache_expiry"
+        self.create_and_upload_file(file_name, "test file id cache expiry")
+        nxc = self.nxc_local.with_attr(file_id_cache=FileIdCache(ttl=0))
+        file_data = nxc.get_file(file_name, fields=['file_id'])
+        # deleted and created again by another client
+        self.nxc_local.delete_path(file_name)
+        self.nxc_local.upload_file(file_name, file_name)
+        assert nxc.file_id_cache.get_file_id(file_name) is None
+        assert nxc.get_file(file_name, fields=['file_id']).file_id != file_data.file_id
+        self.nxc_local.delete_path(file_name)
+        os.remove(file_name)
+
+    def test_metadata_cache(self):
+        file_name = "test_metadata_cache"
+        self.create_and_upload_file(file_name, "test metadata cache")
+        nxc = self.nxc_local.with_attr(metadata_cache=MetadataCache(ttl=0))
+        file_data = nxc.get_file(file_name)
+        assert nxc.get_file(file_name) == file_data
+        stats = nxc.metadata_cache.stats
+        assert (stats['misses'], stats['hits'], stats['revalidations']) == (1, 1, 1)
+        # changed files are fetched again
+        nxc.upload_file_contents(b'new content', file_name)
+        assert nxc.get_file(file_name).etag != file_data.etag
+        assert nxc.metadata_cache.stats['misses'] == 2
+        nxc.delete_path(file_name)
+        assert nxc.get_file(file_name) is None
+        os.remove(file_name)
+
+    def test_content_cache(self):
+        file_name = "test_content_cache"
+        cache_dir = tempfile.mkdtemp()
+        nxc = self.nxc_local.with_attr(content_cache=ContentCache(cache_dir))
+        nxc.upload_file_contents(b'test content cache', file_name)
+        res = nxc.download_content(file_name)
+        assert res.is_ok and res.data == b'test content cache'
+        assert res.status_code == self.NOT_MODIFIED_CODE
+        # changed by another client
+        self.nxc_local.upload_file_contents(b'changed', file_name)
+        res = nxc.download_content(file_name)
+        assert res.is_ok and res.data == b'changed'
+        assert res.status_code == self.OK_CODE
+        nxc.delete_path(file_name)
+        shutil.rmtree(cache_dir)
+
+    def test_conditional_upload(self):
+        file_name = "test_conditional_upload"
+        res = self.nxc_local.upload_file_contents(b'content', file_name, if_none_match='*')
+        assert res.is_ok
+        res = self.nxc_local.upload_file_contents(b'content', file_name, if_none_match='*')
+        assert res.status_code == self.PRECONDITION_FAILED_CODE
+        etag = self.nxc_local.get_file(file_name, fields=['etag']).etag
+        res = self.nxc_local.upload_file_contents(b'other', file_name, if_match='"bad etag"')
+        assert res.status_code == self.PRECONDITION_FAILED_CODE
+        res = self.nxc_local.upload_file_contents(b'other', file_name, if_match=etag)
+        assert res.status_code == self.NO_CONTENT_CODE
+
+        # same content is not uploaded again
+        res = self.nxc_local.upload_file_contents(b'new', file_name, skip_unchanged=True)
+        assert res.status_code == self.NO_CONTENT_CODE
+        res = self.nxc_local.upload_file_contents(b'new', file_name, skip_unchanged=True)
+        assert res.is_ok
+        assert res.status_code == self.MULTISTATUS_CODE
+        self.nxc_local.delete_path(file_name)
+
+    def test_move_copy_paths(self):
+        folder = "test_move_paths"
+        file_names = ['file_%s' % idx for idx in range(4)]
+        self.nxc_local.ensure_tree_exists(folder + '/src')
+        for file_name in file_names:
+            self.nxc_local.upload_file_contents(b'content', folder + '/src/' + file_name)
+        pairs = [(folder + '/src/' + name, folder + '/dst/sub/' + name) for name in file_names]
+        pairs.append((folder + '/src/missing', folder + '/dst/sub/missing'))
+        results = self.nxc_local.copy_paths(pairs, max_workers=4)
+        assert [(src, dst) for src, dst, _error in results] == pairs
+        assert all(error is None for _src, _dst, error in results[:-1])
+        assert results[-1][2] is not None
+
+        # moves in the same folder are serialized
+        pairs = [(folder + '/dst/sub', folder + '/dst/moved'),
+                 (folder + '/dst/moved/file_0', folder + '/dst/moved/file_renamed'),
+                 (folder + '/src/file_1', folder + '/dst/moved/file_1')]
+        results = self.nxc_local.move_paths(pairs, max_workers=4)
+        assert results[2][2].obj.status_code == self.PRECONDITION_FAILED_CODE
+        assert all(error is None for _src, _dst, error in results[:2])
+        names = sorted(_file.basename() for _file in self.nxc_local.get_folder(
+            folder + '/dst/moved').list())
+        assert names == ['file_1', 'file_2', 'file_3', 'file_renamed']
+        self.nxc_local.delete_path(folder)
+
+    def test_delete_paths(self):
+        folder = "test_delete_paths"
+        self.nxc_local.ensure_tree_exists([folder + '/empty', folder + '/not_empty/sub'])
+        self.nxc_local.upload_file_contents(b'content', folder + '/file')
+        paths = [folder + '/empty', folder + '/not_empty', folder + '/file',
+                 folder + '/missing']
+        errors = dict(self.nxc_local.delete_paths(paths, max_workers=2))
+        assert errors[folder + '/empty'] is None
+        assert errors[folder + '/file'] is None
+        assert isinstance(errors[folder + '/not_empty'], NextCloudDirectoryNotEmpty)
+        assert errors[folder + '/missing'] is not None
+        names = [_file.basename() for _file in self.nxc_local.get_folder(folder).list()]
+        assert names == ['not_empty']
+
+        # listings of the metadata cache are not used to check the folders
+        nxc = self.nxc_local.with_attr(metadata_cache=MetadataCache(ttl=60))
+        nxc.list_folders(folder + '/not_empty/sub')
+        self.nxc_local.create_folder(folder + '/not_empty/sub/new')
+        errors = dict(nxc.delete_paths([folder + '/not_empty/sub']))
+        assert isinstance(errors[folder + '/not_empty/sub'], NextCloudDirectoryNotEmpty)
+
+        # folders are deleted after their content, each path once
+        sub_paths = [folder + '/not_empty/sub/new', folder + '/not_empty/sub',
+                     folder + '/not_empty']
+        results = self.nxc_local.delete_paths(sub_paths[::-1] + sub_paths[:1])
+        assert results == [(path, None) for path in sub_paths[::-1] + sub_paths[:1]]
+
+        results = self.nxc_local.delete_paths([folder, folder + '/not_empty'], recursive=True)
+        assert results == [(folder, None), (folder + '/not_empty', None)]
+        assert self.nxc_local.get_file(folder) is None
+
+    def test_upload_streams(self):
+        file_name = "test_upload_streams"
+        contents = [
+            (bytearray(b'bytearray content'), b'bytearray content'),
+            (memoryview(b'memoryview content'), b'memoryview content'),
+            (io.BytesIO(b'file content'), b'file content'),
+            ((chunk for chunk in [b'generated ', b'content']), b'generated content'),
+        ]
+        for file_contents, expected_content in contents:
+            res = self.nxc_local.upload_file_contents(file_contents, file_name)
+            assert res.is_ok
+            assert self.nxc_local.download_content(file_name).data == expected_content
+        self.nxc_local.delete_path(file_name)
+
+    def test_open_file(self):
+        file_name = "test_open_file.zip"
+        zip_content = io.BytesIO()
+        with zipfile.ZipFile(zip_content, 'w') as zip_file:
+            zip_file.writestr('big_file', os.urandom(512 * 1024))
+            zip_file.writestr('small_file', b'small file content')
+        self.nxc_local.upload_file_contents(zip_content.getvalue(), file_name)
+
+        remote_file = self.nxc_local.get_file(file_name).open('rb', block_size=4096)
+        with zipfile.ZipFile(remote_file) as zip_file:
+            assert sorted(zip_file.namelist()) == ['big_file', 'small_file']
+            assert zip_file.read('small_file') == b'small file content'
+        # only the end of the file was transferred
+        assert remote_file.bytes_transferred < 64 * 1024
+        remote_file.seek(0)
+        assert remote_file.read(4) == zip_content.getvalue()[:4]
+        remote_file.close()
+        self.nxc_local.delete_path(file_name)
+
+    def test_open_file_without_range(self):
+        file_name = "test_open_file_without_range"
+        content = os.urandom(64 * 1024)
+        self.nxc_local.upload_file_contents(content, file_name)
+        session = self.nxc_local.session
+        request = session.request
+
+        def _request_without_range(method, url, **kwargs):
+            # server ignoring Range requests
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            kwargs['headers'].pop('Range', None)
+            return request(method, url, **kwargs)
+
+        with patch.object(session, 'request', side_effect=_request_without_range) as mock_request:
+            remote_file = self.nxc_local.get_file(file_name).open('rb', block_size=4096)
+            requests_count = mock_request.call_count
+            remote_file.seek(-10, io.SEEK_END)
+            assert remote_file.read() == content[-10:]
+            remote_file.seek(0)
+            assert remote_file.read() == content
+            # the content was downloaded once
+            assert mock_request.call_count == requests_count + 1
+            assert remote_file.bytes_transferred == len(content)
+        remote_file.close()
+        self.nxc_local.delete_path(file_name)
+
+    def test_compressed_responses(self):
+        res = self.nxc_local.list_folders(all_properties=True)
+        assert res.is_ok
+        assert res.decoded_bytes == len(res.raw_content_data)
+        if res.content_encoding:
+            assert res.wire_bytes < res.decoded_bytes
+        # compression can be disabled
+        nxc = self.nxc_local.with_attr(session_kwargs={'accept_encoding': 'identity'})
+        res = nxc.list_folders(all_properties=True)
+        assert res.is_ok
+        assert res.content_encoding is None
+
     def test_set_list_favorites(self):
         # create new file to make favorite
         file_name = "test_favorite"
@@ -368,3 +598,68 @@ class TestWebDAV(LocalNxcUserMixin, BaseTestCase):
         timestamp_str = " "
         timestamp_unix_time = timestamp_from_string(timestamp_str)
         assert timestamp_unix_time is None
+
+
+class TestReportPagination(TestCase):
+
+    URL = 'http://host/remote.php/dav/files/user'
+
+    def get_interaction(self, *names):
+        responses = ''.join(
+            '<d:response><d:href>/remote.php/dav/files/user/%s</d:href><d:propstat><d:prop>'
+            '<oc:fileid>%s</oc:fileid></d:prop><d:status>HTTP/1.1 200 OK</d:status>'
+            '</d:propstat></d:response>' % (name, idx) for idx, name in enumerate(names))
+        body = ('<?xml version="1.0"?><d:multistatus xmlns:d="DAV:" '
+                'xmlns:oc="http://owncloud.org/ns">%s</d:multistatus>' % responses)
+        return {'request': {'method': 'REPORT', 'url': self.URL},
+                'response': {'status_code': 207, 'reason': 'Multi-Status',
+                             'headers': [['Content-Type', 'application/xml']], 'body': body}}
+
+    def iter_files(self, interactions):
+        transport = ReplayTransport(interactions)
+        bodies = []
+        send = transport.send
+        transport.send = lambda request, **kwargs: bodies.append(request.body) or send(
+            request, **kwargs)
+        nxc = NextCloud('http://host', 'user', 'password',
+                        session_kwargs={'transport': transport})
+        files = [file_data.basename() for file_data in nxc.iter_files_with_filter(
+            filter_rules={'oc': {'systemtag': 1}}, page_size=2, fields=['file_id'])]
+        return files, bodies
+
+    def test_offset(self):
+        files, bodies = self.iter_files([
+            self.get_interaction('a', 'b'), self.get_interaction('c')])
+        assert files == ['a', 'b', 'c']
+        assert b'xmlns:nc="http://nextcloud.org/ns"' in bodies[1]
+        assert b'<nc:firstresult>2</nc:firstresult>' in bodies[1]
+
+    def test_offset_ignored(self):
+        # the first page is returned again : all files are requested at once
+        files, bodies = self.iter_files([
+            self.get_interaction('a', 'b'), self.get_interaction('a', 'b'),
+            self.get_interaction('a', 'b', 'c')])
+        assert files == ['a', 'b', 'c']
+        assert b'nresults' not in bodies[2]
+
+
+class TestMetadataCacheHits(TestCase):
+
+    def test_hits_not_parsed(self):
+        body = ('<?xml version="1.0"?><d:multistatus xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+                '<d:response><d:href>/remote.php/dav/files/user/file</d:href><d:propstat><d:prop>'
+                '<oc:fileid>12</oc:fileid><d:getetag>"etag"</d:getetag></d:prop>'
+                '<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response></d:multistatus>')
+        transport = ReplayTransport([
+            {'request': {'method': 'PROPFIND', 'url': 'http://host/remote.php/dav/files/user/file'},
+             'response': {'status_code': 207, 'reason': 'Multi-Status',
+                          'headers': [['Content-Type', 'application/xml']], 'body': body}}])
+        nxc = NextCloud('http://host', 'user', 'password', metadata_cache=MetadataCache(ttl=60),
+                        session_kwargs={'transport': transport})
+        file_data = nxc.get_file('file', fields=['file_id'])
+        assert nxc.file_id_cache.get_file_id('file') == 12
+        nxc.file_id_cache.clear()
+        assert nxc.get_file('file', fields=['file_id']) == file_data
+        assert nxc.metadata_cache.stats['hits'] == 1
+        # cached listings don't renew the cached file ids
+        assert nxc.file_id_cache.get_file_id('file') is None